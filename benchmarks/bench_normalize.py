@@ -0,0 +1,63 @@
+import re
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pipeline.full_resume_extractor import extract_text
+from pipeline.normalizer import AliasTable, NormalizedDocument
+from pipeline.ontology import DATA_DIR
+
+SIZES = [1, 10, 100]
+REPEATS = 20
+
+# the rewrites legacy_normalize hardcodes, as an alias table
+LEGACY_ALIASES = {"postgre sql": "postgresql", "my sql": "mysql", "sci kit learn": "scikitlearn"}
+
+
+def legacy_repair_broken_spacing(text):
+    fixed_lines = []
+    for line in text.splitlines():
+        if re.match(r'^(?:[A-Za-z]\s+){3,}[A-Za-z]$', line.strip()):
+            fixed_lines.append(line.replace(" ", ""))
+        else:
+            fixed_lines.append(line)
+    return "\n".join(fixed_lines)
+
+
+def legacy_normalize(text):
+    text = text.lower()
+    text = re.sub(r'(?<=\b[a-z])\s+(?=[a-z]\b)', '', text)
+    text = text.replace("postgre sql", "postgresql")
+    text = text.replace("my sql", "mysql")
+    text = text.replace("sci kit learn", "scikitlearn")
+    text = re.sub(r'[^a-z0-9+.# ]', ' ', text)
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text
+
+
+def fused_normalize(text, aliases):
+    return aliases.rewrite(NormalizedDocument(text).text)
+
+
+def main():
+    raw = extract_text(DATA_DIR / "Resume.pdf")
+    sample = raw + "\nS K I L L S\nMachineLearning Py Torch 2023Intern\nPostgre SQL, My SQL, sci kit learn\n"
+    aliases = AliasTable(LEGACY_ALIASES)
+
+    print(f"{'copies':>7} {'chars':>9} {'legacy ms':>10} {'fused ms':>10} {'speedup':>8}")
+
+    for copies in SIZES:
+        text = sample * copies
+        assert fused_normalize(text, aliases) == legacy_normalize(legacy_repair_broken_spacing(text))
+
+        legacy = timeit.timeit(lambda: legacy_normalize(legacy_repair_broken_spacing(text)), number=REPEATS)
+        fused = timeit.timeit(lambda: fused_normalize(text, aliases), number=REPEATS)
+
+        print(f"{copies:>7} {len(text):>9} {legacy / REPEATS * 1000:>10.3f} "
+              f"{fused / REPEATS * 1000:>10.3f} {legacy / fused:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
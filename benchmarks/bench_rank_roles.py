@@ -0,0 +1,63 @@
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pipeline.full_resume_extractor import extract_text_from_pdf
+from pipeline.text_cleaner import clean_text
+from pipeline.ontology import DATA_DIR, get_ontology
+from pipeline.role_index import RoleIndex
+from pipeline.skill_engine import prepare_resume_hits
+from pipeline.skill_graph import get_skill_graph
+
+ROLE_COUNTS = [30, 100, 1000, 10000]
+REPEATS = 200
+
+
+def synthetic_dictionary(base, n_roles, seed=0):
+    rnd = random.Random(seed)
+    real_skills = sorted({s for r in base.values() for t in r.values() for s in t})
+
+    dictionary = dict(list(base.items())[:n_roles])
+
+    for i in range(len(dictionary), n_roles):
+        phrases = [f"learnedskill{rnd.randrange(100000)}" for _ in range(20)]
+        if rnd.random() < 0.2:
+            phrases[rnd.randrange(8)] = rnd.choice(real_skills)
+        dictionary[f"learnedrole{i}"] = {
+            "core": phrases[:8],
+            "preferred": phrases[8:14],
+            "tools": phrases[14:20],
+        }
+
+    return dictionary
+
+
+def main():
+    ontology = get_ontology()
+    raw = extract_text_from_pdf(str(DATA_DIR / "Resume.pdf"))
+    resume_hits, project_hits = prepare_resume_hits(clean_text(raw), raw, ontology)
+
+    print(f"{'roles':>8} {'build ms':>10} {'rank p50 ms':>12} {'rank p99 ms':>12}")
+
+    for n_roles in ROLE_COUNTS:
+        dictionary = synthetic_dictionary(ontology.skills_dictionary, n_roles)
+
+        start = time.perf_counter()
+        index = RoleIndex(dictionary, ontology.role_aliases, ontology.skill_aliases, get_skill_graph(ontology))
+        build_ms = (time.perf_counter() - start) * 1000
+
+        timings = []
+        for _ in range(REPEATS):
+            start = time.perf_counter()
+            index.rank(index.resume_keys(resume_hits, project_hits), top_k=5)
+            timings.append((time.perf_counter() - start) * 1000)
+
+        print(f"{n_roles:>8} {build_ms:>10.2f} {statistics.median(timings):>12.3f} {sorted(timings)[int(len(timings) * 0.99)]:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
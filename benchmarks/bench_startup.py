@@ -0,0 +1,67 @@
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from benchmarks.corpus import CorpusGenerator
+
+REPEATS = 10
+
+CHILD = r"""
+import json, sys, time
+start = time.perf_counter()
+from pipeline.skill_engine import rank_roles
+from pipeline.text_cleaner import clean_text
+imported = time.perf_counter()
+
+text = sys.stdin.read()
+rank_roles(clean_text(text), text, top_k=5)
+first = time.perf_counter()
+rank_roles(clean_text(text), text, top_k=5)
+warm = time.perf_counter()
+
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "first_request_ms": (first - imported) * 1000,
+    "warm_request_ms": (warm - first) * 1000,
+    "heavy_modules": sorted(m for m in ("pypdf", "reportlab", "urllib.request") if m in sys.modules),
+}))
+"""
+
+
+def run_child(resume_text):
+    start = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD],
+        input=resume_text, capture_output=True, text=True, check=True, cwd=BASE_DIR,
+    )
+    record = json.loads(out.stdout)
+    record["process_ms"] = (time.perf_counter() - start) * 1000
+    return record
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure cold-start import and first-request time.")
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    args = parser.parse_args(argv)
+
+    resume_text = CorpusGenerator(seed=0).resume(600)
+
+    runs = [run_child(resume_text) for _ in range(args.repeats)]
+    median = {k: statistics.median(r[k] for r in runs)
+              for k in ("process_ms", "import_ms", "first_request_ms", "warm_request_ms")}
+    heavy = ",".join(runs[0]["heavy_modules"]) or "-"
+
+    print(f"{'process ms':>11} {'import ms':>10} {'first req ms':>13} {'warm req ms':>12}  heavy modules")
+    print(f"{median['process_ms']:>11.1f} {median['import_ms']:>10.1f} "
+          f"{median['first_request_ms']:>13.1f} {median['warm_request_ms']:>12.2f}  {heavy}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import io
+import random
+
+from pipeline.ontology import get_ontology
+from pipeline.skill_graph import get_skill_graph
+
+FILLER = (
+    "built designed led improved delivered maintained analysed reported managed the a of for with "
+    "team project system customers quality results data process weekly stakeholders across new"
+).split()
+
+SECTIONS = ["SUMMARY", "EXPERIENCE", "PROJECTS", "SKILLS", "EDUCATION", "CERTIFICATIONS"]
+
+
+def skill_vocabulary(ontology=None):
+    ontology = ontology or get_ontology()
+    skills = {
+        skill
+        for role in ontology.skills_dictionary.values()
+        for tier in ("core", "preferred", "tools")
+        for skill in role[tier]
+    }
+    return sorted(skills), sorted(get_skill_graph(ontology).triggers)
+
+
+def spaced_out(word):
+    return " ".join(word.upper())
+
+
+def camel_joined(words):
+    return "".join(w.capitalize() for w in words)
+
+
+class CorpusGenerator:
+    def __init__(self, seed=0, ontology=None):
+        self.rnd = random.Random(seed)
+        self.ontology = ontology or get_ontology()
+        self.skills, self.triggers = skill_vocabulary(self.ontology)
+
+    def _sentence(self, skill_rate):
+        words = []
+        for _ in range(self.rnd.randint(8, 16)):
+            if self.rnd.random() < skill_rate:
+                words.append(self.rnd.choice(self.skills if self.rnd.random() < 0.7 else self.triggers))
+            else:
+                words.append(self.rnd.choice(FILLER))
+
+        if self.rnd.random() < 0.15:
+            i = self.rnd.randrange(len(words) - 1)
+            words[i:i + 2] = [camel_joined(words[i:i + 2])]
+        if self.rnd.random() < 0.1:
+            words.append(f"{self.rnd.choice(FILLER)}{self.rnd.randint(2015, 2025)}")
+
+        return " ".join(words) + "."
+
+    def resume(self, n_words=400, skill_rate=0.25, artifact_rate=0.05):
+        lines = []
+        words = 0
+        sections = iter(SECTIONS * (n_words // 200 + 1))
+
+        while words < n_words:
+            heading = next(sections)
+            lines.append(spaced_out(heading) if self.rnd.random() < artifact_rate else heading)
+
+            for _ in range(self.rnd.randint(2, 6)):
+                sentence = self._sentence(skill_rate)
+                if self.rnd.random() < artifact_rate:
+                    lines.append(spaced_out(self.rnd.choice(self.skills)))
+                lines.append(sentence)
+                words += sentence.count(" ") + 1
+
+        return "\n".join(lines)
+
+    def job_description(self, role=None, n_words=200):
+        roles = list(self.ontology.skills_dictionary)
+        role = role or self.rnd.choice(roles)
+        definition = self.ontology.skills_dictionary[role]
+        required = [s for tier in ("core", "preferred", "tools") for s in definition[tier]]
+
+        lines = [f"{role.title()} wanted", "Responsibilities"]
+        words = 0
+        while words < n_words:
+            sentence = self._sentence(0.1)
+            if required:
+                sentence = f"{self.rnd.choice(required)} {sentence}"
+            lines.append(sentence)
+            words += sentence.count(" ") + 1
+
+        return role, "\n".join(lines)
+
+
+def resume_pdf(text):
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import SimpleDocTemplate, Paragraph
+
+    styles = getSampleStyleSheet()
+    story = [Paragraph(line, styles["BodyText"]) for line in text.splitlines() if line.strip()]
+
+    buffer = io.BytesIO()
+    SimpleDocTemplate(buffer).build(story)
+    return buffer.getvalue()
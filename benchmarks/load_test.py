@@ -0,0 +1,417 @@
+import argparse
+import base64
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import string
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from benchmarks.corpus import CorpusGenerator, resume_pdf
+from pipeline.ontology import DATA_DIR, configure_ontology
+from pipeline.role_classifier import classify_role
+from pipeline.service import HttpClient, LocalClient, ScoringService, encode_pdf
+
+# resume: default-role analysis, rank: /rank-roles, jd: analysis against a JD of a
+# known role, new_role: a JD no role matches, so the service learns one
+KINDS = ("resume", "rank", "jd", "new_role")
+DEFAULT_MIX = "resume=60,rank=10,jd=25,new_role=5"
+
+RESUME_WORDS = (150, 400, 900)
+INPUT_POOL = 64
+PDF_POOL = 8
+
+CLK_TCK = os.sysconf("SC_CLK_TCK")
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+SERVER = r"""
+import signal, sys
+from pipeline.ontology import configure_ontology
+from pipeline.service import ScoringService, make_server
+
+workdir, port, pdf_workers, max_concurrency, queue_timeout = sys.argv[1:6]
+configure_ontology(f"{workdir}/skills.json", f"{workdir}/learned_roles.json")
+service = ScoringService(int(pdf_workers) or None, int(max_concurrency), float(queue_timeout))
+server = make_server(service, "127.0.0.1", int(port))
+signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+try:
+    server.serve_forever()
+finally:
+    server.server_close()
+    service.close()
+"""
+
+
+def parse_mix(spec):
+    mix = {}
+    for part in spec.split(","):
+        kind, _, weight = part.partition("=")
+        kind = kind.strip()
+        if kind not in KINDS:
+            raise ValueError(f"unknown request kind '{kind}' (expected one of {', '.join(KINDS)})")
+        mix[kind] = float(weight or 1)
+    if not any(mix.values()):
+        raise ValueError("the mix needs at least one kind with a positive weight")
+    return mix
+
+
+class Workload:
+    # every input is generated up front from the seed, and the requests are drawn
+    # in a fixed order, so two runs with the same arguments replay the same requests
+    def __init__(self, mix, seed=0, pdf_rate=0.0):
+        self.rnd = random.Random(seed)
+        self.kinds, self.weights = zip(*mix.items())
+        self.pdf_rate = pdf_rate
+
+        gen = CorpusGenerator(seed=seed)
+        self.resumes = [gen.resume(self.rnd.choice(RESUME_WORDS)) for _ in range(INPUT_POOL)]
+        jds = [path.read_text(encoding="utf-8") for path in sorted(DATA_DIR.glob("jd_*.txt"))]
+        jds += [gen.job_description(n_words=self.rnd.choice(RESUME_WORDS) // 2)[1] for _ in range(INPUT_POOL)]
+        # only JDs the classifier maps to a known role; the others are new_role's business
+        self.jds = [jd for jd in jds if classify_role(jd)["role"] is not None]
+
+        self.pdfs = []
+        if pdf_rate:
+            self.pdfs.append(encode_pdf(DATA_DIR / "Resume.pdf"))
+            self.pdfs += [base64.b64encode(resume_pdf(text)).decode("ascii") for text in self.resumes[:PDF_POOL]]
+
+        self._lock = threading.Lock()
+
+    def _novel_jd(self):
+        # made-up words, so no keyword of a known (or earlier learned) role matches
+        def word():
+            return "".join(self.rnd.choice(string.ascii_lowercase) for _ in range(self.rnd.randint(6, 10)))
+
+        lines = [f"{word().title()} {word().title()} wanted", "Responsibilities"]
+        for _ in range(self.rnd.randint(8, 20)):
+            lines.append(" ".join(word() for _ in range(self.rnd.randint(6, 12))) + ".")
+        return "\n".join(lines)
+
+    def next(self):
+        with self._lock:
+            kind = self.rnd.choices(self.kinds, self.weights)[0]
+
+            if self.pdfs and self.rnd.random() < self.pdf_rate:
+                payload = {"resume_pdf_base64": self.rnd.choice(self.pdfs)}
+            else:
+                payload = {"resume_text": self.rnd.choice(self.resumes)}
+
+            if kind == "rank":
+                return kind, "/rank-roles", payload
+            if kind == "jd":
+                payload["jd_text"] = self.rnd.choice(self.jds)
+            elif kind == "new_role":
+                payload["jd_text"] = self._novel_jd()
+                payload["learn"] = True
+            return kind, "/analyze", payload
+
+
+def _proc_stat(pid):
+    with open(f"/proc/{pid}/stat", "rb") as f:
+        data = f.read()
+    # the command name may contain spaces; the fields after it are fixed
+    fields = data[data.rindex(b")") + 2:].split()
+    return int(fields[1]), int(fields[11]) + int(fields[12]), int(fields[21]) * PAGE_SIZE
+
+
+def tree_usage(root):
+    # CPU ticks and resident bytes of root and every process below it (the PDF pool)
+    stats = {}
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                stats[int(entry)] = _proc_stat(entry)
+            except (OSError, ValueError, IndexError):
+                pass
+
+    children = defaultdict(list)
+    for pid, (ppid, _, _) in stats.items():
+        children[ppid].append(pid)
+
+    ticks = rss = 0
+    pending = [root]
+    while pending:
+        pid = pending.pop()
+        if pid in stats:
+            ticks += stats[pid][1]
+            rss += stats[pid][2]
+        pending.extend(children[pid])
+    return ticks, rss
+
+
+class ResourceSampler(threading.Thread):
+    def __init__(self, pid, interval=1.0):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.samples = []
+        self._done = threading.Event()
+
+    def sample(self):
+        # without a pid (a remote --url) only the timestamps are kept
+        self.samples.append((time.perf_counter(),) + (tree_usage(self.pid) if self.pid else (None, None)))
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            self.sample()
+
+    def stop(self):
+        self._done.set()
+        self.join()
+        self.sample()
+
+
+def _send(client, kind, path, payload, scheduled, records):
+    try:
+        status = client.post(path, payload)[0]
+    except OSError as e:
+        # refused or reset connections are part of what an overloaded node does
+        status = type(e).__name__
+    records.append((kind, scheduled, time.perf_counter(), status))
+
+
+def run_open_loop(client, workload, rate, duration, max_inflight, records):
+    # arrivals do not wait for responses; latency counts from the scheduled arrival,
+    # so time spent queued behind max_inflight busy clients is included
+    arrivals = random.Random(workload.rnd.random())
+    start = time.perf_counter()
+    at = arrivals.expovariate(rate)
+
+    with ThreadPoolExecutor(max_workers=max_inflight, thread_name_prefix="load") as pool:
+        while at < duration:
+            delay = start + at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(_send, client, *workload.next(), start + at, records)
+            at += arrivals.expovariate(rate)
+
+
+def run_closed_loop(client, workload, concurrency, duration, records):
+    deadline = time.perf_counter() + duration
+
+    def loop():
+        while time.perf_counter() < deadline:
+            _send(client, *workload.next(), time.perf_counter(), records)
+
+    threads = [threading.Thread(target=loop, name=f"load-{i}") for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def _latency_summary(latencies):
+    ordered = sorted(latencies)
+    if not ordered:
+        return {"n": 0}
+
+    def pick(q):
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000, 2)
+
+    return {
+        "n": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2),
+        "p50_ms": pick(0.5),
+        "p90_ms": pick(0.9),
+        "p99_ms": pick(0.99),
+        "max_ms": round(ordered[-1] * 1000, 2),
+    }
+
+
+def summarize(records, samples, start, end):
+    ok = [r for r in records if r[3] == 200]
+    by_kind = defaultdict(list)
+    for kind, scheduled, done, _ in ok:
+        by_kind[kind].append(done - scheduled)
+
+    elapsed = end - start
+    summary = {
+        "requests": len(records),
+        "ok": len(ok),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(ok) / elapsed, 3) if elapsed else 0,
+        "status": dict(Counter(str(r[3]) for r in records)),
+        "latency": _latency_summary([done - scheduled for _, scheduled, done, _ in ok]),
+        "by_kind": {kind: _latency_summary(latencies) for kind, latencies in sorted(by_kind.items())},
+    }
+
+    # one row per sampling interval: what finished in it and what it cost
+    timeline = []
+    for (t0, ticks0, _), (t1, ticks1, rss) in zip(samples, samples[1:]):
+        window = [r for r in records if t0 <= r[2] < t1]
+        latency = _latency_summary([done - scheduled for _, scheduled, done, status in window if status == 200])
+        timeline.append({
+            "t_s": round(t1 - start, 2),
+            "completed": len(window),
+            "errors": sum(1 for r in window if r[3] != 200),
+            "rps": round(len(window) / (t1 - t0), 2),
+            "p50_ms": latency.get("p50_ms"),
+            "p99_ms": latency.get("p99_ms"),
+            "cpu_percent": None if rss is None else round((ticks1 - ticks0) / CLK_TCK / (t1 - t0) * 100, 1),
+            "rss_mb": None if rss is None else round(rss / 2 ** 20, 1),
+        })
+
+    return summary, timeline
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_until_healthy(client, proc, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"service exited with status {proc.returncode} before it was ready")
+        try:
+            if client.get("/health")[0] == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("service did not become healthy in time")
+
+
+@contextmanager
+def open_target(args, workdir):
+    # yields a client and the pid whose process tree is sampled
+    if args.url:
+        yield HttpClient(args.url), args.pid
+        return
+
+    if args.target == "inproc":
+        configure_ontology(workdir / "skills.json", workdir / "learned_roles.json")
+        service = ScoringService(args.pdf_workers, args.max_concurrency, args.queue_timeout)
+        try:
+            yield LocalClient(service), os.getpid()
+        finally:
+            service.close()
+            configure_ontology()
+        return
+
+    port = _free_port()
+    proc = subprocess.Popen(
+        [sys.executable, "-c", SERVER, str(workdir), str(port), str(args.pdf_workers or 0),
+         str(args.max_concurrency), str(args.queue_timeout)],
+        cwd=BASE_DIR,
+    )
+    try:
+        client = HttpClient(f"http://127.0.0.1:{port}")
+        _wait_until_healthy(client, proc)
+        yield client, proc.pid
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+
+def run_load_test(args):
+    workload = Workload(parse_mix(args.mix), args.seed, args.pdf_rate)
+    workdir = Path(tempfile.mkdtemp(prefix="load_test_"))
+    # roles learned during the run go to a copy of the ontology; the log holds the
+    # roles learned since the snapshot was last compacted
+    for name in ("skills.json", "learned_roles.json", "learned_roles.log"):
+        if (DATA_DIR / name).exists():
+            shutil.copy(DATA_DIR / name, workdir / name)
+
+    try:
+        with open_target(args, workdir) as (client, pid):
+            for _ in range(args.warmup):
+                _send(client, *workload.next(), time.perf_counter(), [])
+
+            records = []
+            sampler = ResourceSampler(pid, args.interval)
+            sampler.sample()
+            sampler.start()
+            start = time.perf_counter()
+
+            if args.rate:
+                run_open_loop(client, workload, args.rate, args.duration, args.max_inflight, records)
+            else:
+                run_closed_loop(client, workload, args.concurrency, args.duration, records)
+
+            end = time.perf_counter()
+            sampler.stop()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    summary, timeline = summarize(records, sampler.samples, start, end)
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "target": args.url or args.target,
+            "load": {"rate": args.rate} if args.rate else {"concurrency": args.concurrency},
+            "duration_s": args.duration,
+            "mix": args.mix,
+            "pdf_rate": args.pdf_rate,
+            "seed": args.seed,
+            # in process, the load generator's own threads are part of the CPU figure
+            "sampled_pid": pid,
+        },
+        "summary": summary,
+        "timeline": timeline,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Replay a mix of analysis requests at a fixed arrival rate or concurrency and report "
+                    "throughput, latency percentiles, CPU and RSS over time."
+    )
+    parser.add_argument("--target", choices=("inproc", "http"), default="inproc",
+                        help="drive the service in this process, or start it as a local HTTP server")
+    parser.add_argument("--url", help="load a service that is already running (it learns the new roles)")
+    parser.add_argument("--pid", type=int, help="with --url: the service process to sample CPU and RSS of")
+
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument("--rate", type=float, help="open loop: mean requests per second, Poisson arrivals")
+    load.add_argument("--concurrency", type=int, default=4, help="closed loop: clients sending back to back")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of measured load")
+    parser.add_argument("--max-inflight", type=int, default=64, help="open loop: most requests outstanding at once")
+    parser.add_argument("--warmup", type=int, default=5, help="requests sent one by one before measuring")
+
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="relative weights of " + ", ".join(KINDS))
+    parser.add_argument("--pdf-rate", type=float, default=0.2, help="share of requests sending a PDF instead of text")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between CPU/RSS samples")
+
+    parser.add_argument("--pdf-workers", type=int, default=None)
+    parser.add_argument("--max-concurrency", type=int, default=8)
+    parser.add_argument("--queue-timeout", type=float, default=0.5)
+    parser.add_argument("--output", help="write results JSON here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    results = run_load_test(args)
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+
+    summary, latency = results["summary"], results["summary"]["latency"]
+    print(f"{summary['ok']}/{summary['requests']} ok, {summary['throughput_rps']} req/s, "
+          f"p50 {latency.get('p50_ms')} ms, p99 {latency.get('p99_ms')} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import argparse
+import json
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.corpus import CorpusGenerator, resume_pdf
+from pipeline.full_resume_extractor import iter_pages
+from pipeline.ontology import DATA_DIR, configure_ontology, get_ontology
+from pipeline.reports import render_pdf_report
+from pipeline.role_builder import build_new_role
+from pipeline.role_detector import detect_role
+from pipeline.skill_engine import evaluate_multiple_roles, extract_skills
+from pipeline.text_cleaner import clean_text
+
+SIZES = {"small": 300, "medium": 1500, "large": 8000}
+DEFAULT_TOLERANCE = 0.25
+
+
+def _time(fn, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def _summary(timings):
+    ordered = sorted(timings)
+    return {
+        "n": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered), 4),
+        "p50_ms": round(ordered[len(ordered) // 2], 4),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 4),
+        "min_ms": round(ordered[0], 4),
+    }
+
+
+def run_benchmarks(sizes=("small", "medium", "large"), repeats=20, seed=0):
+    workdir = Path(tempfile.mkdtemp(prefix="bench_ontology_"))
+    # the log holds the roles learned since the snapshot was last compacted
+    for name in ("skills.json", "learned_roles.json", "learned_roles.log"):
+        if (DATA_DIR / name).exists():
+            shutil.copy(DATA_DIR / name, workdir / name)
+    configure_ontology(workdir / "skills.json", workdir / "learned_roles.json")
+
+    try:
+        gen = CorpusGenerator(seed=seed)
+        roles = dict.fromkeys(get_ontology().skills_dictionary, "")
+        stages = {}
+
+        for size in sizes:
+            raw = gen.resume(SIZES[size])
+            cleaned = clean_text(raw)
+            pdf = resume_pdf(raw)
+            _, jd = gen.job_description(n_words=SIZES[size] // 4)
+
+            stages[f"pdf_extraction[{size}]"] = _time(lambda: "".join(iter_pages(pdf, workers=1)), max(3, repeats // 5))
+            stages[f"clean_text[{size}]"] = _time(lambda: clean_text(raw), repeats)
+            stages[f"extract_skills[{size}]"] = _time(lambda: extract_skills(cleaned, "datascientist"), repeats)
+            stages[f"evaluate_multiple_roles[{size}]"] = _time(
+                lambda: evaluate_multiple_roles(cleaned, raw, roles), repeats
+            )
+            stages[f"detect_role[{size}]"] = _time(lambda: detect_role(jd), repeats)
+
+        counter = iter(range(10 ** 9))
+        _, jd = gen.job_description(n_words=SIZES["small"])
+        stages["build_new_role"] = _time(lambda: build_new_role(f"benchrole{next(counter)}", jd), repeats)
+
+        result = evaluate_multiple_roles(clean_text(raw), raw, roles)[0]
+        stages["generate_pdf_report"] = _time(lambda: render_pdf_report(result), repeats)
+    finally:
+        configure_ontology()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": seed,
+            "repeats": repeats,
+            "sizes": {size: SIZES[size] for size in sizes},
+        },
+        "stages": {name: _summary(timings) for name, timings in stages.items()},
+    }
+
+
+def compare(current, baseline, tolerance=DEFAULT_TOLERANCE):
+    regressions = []
+    for stage, stats in current["stages"].items():
+        base = baseline["stages"].get(stage)
+        if not base or not base["p50_ms"]:
+            continue
+        ratio = stats["p50_ms"] / base["p50_ms"]
+        if ratio > 1 + tolerance:
+            regressions.append({"stage": stage, "baseline_ms": base["p50_ms"], "current_ms": stats["p50_ms"],
+                                "ratio": round(ratio, 3)})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time each stage of the analysis pipeline on a synthetic corpus.")
+    parser.add_argument("--sizes", default="small,medium,large", help="comma separated subset of " + ",".join(SIZES))
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write results JSON here (default: stdout)")
+    parser.add_argument("--baseline", help="results JSON from an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed p50 slowdown before a stage counts as a regression")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.sizes.split(","), args.repeats, args.seed)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            results["regressions"] = compare(results, json.load(f), args.tolerance)
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+
+    for r in results.get("regressions", []):
+        print(f"REGRESSION {r['stage']}: {r['baseline_ms']} ms -> {r['current_ms']} ms ({r['ratio']}x)", file=sys.stderr)
+
+    return 1 if results.get("regressions") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from pipeline.full_resume_extractor import extract_text
+from pipeline.text_cleaner import clean_text
+from pipeline.ontology import get_ontology
+from pipeline.result_cache import MEMORY_BYTES, ResultCache
+from pipeline.role_result import json_default
+from pipeline.skill_engine import get_role_index, get_skill_matcher
+
+
+_WORKER_ROLES = None
+_WORKER_CACHE = None
+
+
+def collect_inputs(source):
+    source = Path(source)
+
+    if source.is_dir():
+        return sorted(str(p) for p in source.rglob("*.pdf"))
+
+    paths = []
+    with open(source, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                line = json.loads(line)["path"]
+            paths.append(str((source.parent / line) if not Path(line).is_absolute() else line))
+    return paths
+
+
+def load_checkpoint(output_path):
+    done = set()
+    output_path = Path(output_path)
+
+    if not output_path.exists():
+        return done
+
+    # drop a line left half-written by an interrupted run
+    with open(output_path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                path = record["path"]
+            except (ValueError, KeyError, TypeError):
+                continue
+            # failures (time budget, I/O, a killed worker) may be transient: retry them,
+            # the new record is appended after the error one
+            if "error" not in record:
+                done.add(path)
+    return done
+
+
+def _init_worker(roles, cache_db=None):
+    global _WORKER_ROLES, _WORKER_CACHE
+    _WORKER_ROLES = dict.fromkeys(roles or get_ontology().skills_dictionary, "")
+    # unique PDFs never hit an in-memory cache; only a shared database can pay off
+    _WORKER_CACHE = ResultCache(max_bytes=0 if cache_db is None else MEMORY_BYTES, db_path=cache_db)
+    get_skill_matcher()
+    get_role_index()
+
+
+def analyze_resume(path, top_k=None):
+    start = time.perf_counter()
+
+    try:
+        raw_text = extract_text(path, workers=1)
+        if not raw_text.strip():
+            raise ValueError("no text extracted")
+
+        results = _WORKER_CACHE.evaluate(clean_text(raw_text), raw_text, _WORKER_ROLES)
+        record = {
+            "path": path,
+            "role": results[0]["role"],
+            "score": results[0]["score"],
+            "verdict": results[0]["verdict"],
+            "results": results[:top_k] if top_k else results,
+        }
+    except Exception as e:
+        record = {"path": path, "error": f"{type(e).__name__}: {e}"}
+
+    record["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 3)
+    return record
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def iter_batch(paths, roles=None, workers=None, max_in_flight=None, top_k=None, cache_db=None):
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or workers * 4
+    paths = iter(paths)
+
+    def new_pool():
+        return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(roles, cache_db))
+
+    pool = new_pool()
+    try:
+        pending = {}
+
+        while True:
+            for path in paths:
+                pending[pool.submit(analyze_resume, path, top_k)] = path
+                if len(pending) >= max_in_flight:
+                    break
+
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            broken = False
+            for future in done:
+                path = pending.pop(future)
+                try:
+                    yield future.result()
+                except BrokenProcessPool as e:
+                    # a worker died (out of memory, a crash in a native library); every
+                    # task it took down gets an error record and is retried next run
+                    broken = True
+                    yield {"path": path, "error": f"{type(e).__name__}: {e}", "elapsed_ms": 0.0}
+
+            if broken:
+                for future, path in pending.items():
+                    if future.done() and future.exception() is None:
+                        yield future.result()
+                    else:
+                        yield {"path": path, "error": "BrokenProcessPool: worker pool was rebuilt", "elapsed_ms": 0.0}
+                pending.clear()
+                pool.shutdown(wait=False, cancel_futures=True)
+                pool = new_pool()
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+
+def run_batch(source, output_path, roles=None, workers=None, max_in_flight=None, top_k=None, resume=True,
+              cache_db=None):
+    paths = collect_inputs(source)
+    done = load_checkpoint(output_path) if resume else set()
+    todo = [p for p in paths if p not in done]
+
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+
+    latencies = []
+    errors = 0
+    start = time.perf_counter()
+
+    with open(output_path, "a" if resume else "w", encoding="utf-8") as out:
+        for record in iter_batch(todo, roles, workers, max_in_flight, top_k, cache_db):
+            out.write(json.dumps(record, default=json_default) + "\n")
+            out.flush()
+
+            latencies.append(record["elapsed_ms"])
+            if "error" in record:
+                errors += 1
+
+    elapsed = time.perf_counter() - start
+
+    return {
+        "inputs": len(paths),
+        "skipped": len(paths) - len(todo),
+        "processed": len(latencies),
+        "errors": errors,
+        "elapsed_sec": round(elapsed, 3),
+        "docs_per_sec": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": _percentile(latencies, 50),
+        "p99_ms": _percentile(latencies, 99),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a folder or manifest of PDF resumes.")
+    parser.add_argument("source", help="directory of PDFs or manifest file (one path or JSON object per line)")
+    parser.add_argument("output", help="JSONL output file, also used as the resume checkpoint")
+    parser.add_argument("--roles", nargs="+", help="roles to score (default: every role in the ontology)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--max-in-flight", type=int, default=None)
+    parser.add_argument("--top-k", type=int, default=None, help="keep only the best K role results per resume")
+    parser.add_argument("--restart", action="store_true", help="ignore existing output and start over")
+    parser.add_argument("--cache-db", help="SQLite file for a result cache shared by all workers")
+    args = parser.parse_args(argv)
+
+    summary = run_batch(
+        args.source,
+        args.output,
+        roles=args.roles,
+        workers=args.workers,
+        max_in_flight=args.max_in_flight,
+        top_k=args.top_k,
+        resume=not args.restart,
+        cache_db=args.cache_db,
+    )
+
+    print(json.dumps(summary), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
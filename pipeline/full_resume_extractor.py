@@ -1,10 +1,348 @@
-from pypdf import PdfReader
+import hashlib
+import io
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from pathlib import Path
 
-def extract_text_from_pdf(pdf_path: str) -> str:
-    reader = PdfReader(pdf_path)
-    text = ""
+from pipeline.instrumentation import count, timed
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+CACHE_DIR = BASE_DIR / "outputs" / "text_cache"
+
+MAX_BYTES = 20 * 1024 * 1024
+MAX_PAGES = 100
+TIME_BUDGET = 30.0
+PARALLEL_MIN_PAGES = 16
+MEMORY_CACHE_SIZE = 256
+DISK_CACHE_BYTES = 512 * 1024 * 1024
+
+
+class PdfBudgetExceeded(ValueError):
+    pass
+
+
+class PdfTimedOut(PdfBudgetExceeded):
+    pass
+
+
+class _TextCache:
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            text = self._entries.get(key)
+            if text is not None:
+                self._entries.move_to_end(key)
+            return text
+
+    def put(self, key, text):
+        with self._lock:
+            self._entries[key] = text
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class _DiskCache:
+    # extracted text by content hash, least recently used files evicted once the
+    # directory outgrows max_bytes; the size is rescanned only when this process's
+    # running estimate says it has
+    def __init__(self, root, max_bytes=DISK_CACHE_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._size = None
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return self.root / key[:2] / f"{key}.txt"
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            text = path.read_bytes().decode("utf-8", "surrogatepass")
+        except FileNotFoundError:
+            return None
+        os.utime(path)
+        return text
+
+    def put(self, key, text):
+        data = text.encode("utf-8", "surrogatepass")
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._files())
+            else:
+                self._size += len(data)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _files(self):
+        for path in self.root.glob("*/*.txt"):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            yield st.st_mtime, st.st_size, path
+
+    def _evict(self):
+        files = sorted(self._files())
+        size = sum(size for _, size, _ in files)
+        # down to 90% of the limit so that this does not run on every put
+        for _, file_size, path in files:
+            if size <= self.max_bytes * 0.9:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            size -= file_size
+        self._size = size
+
+
+def _serve(conn):
+    while True:
+        try:
+            args = conn.recv()
+        except EOFError:
+            return
+        try:
+            reply = (True, _extract_pages(*args))
+        except Exception as e:
+            reply = (False, e)
+        try:
+            conn.send(reply)
+        except Exception:
+            # an exception that does not pickle
+            conn.send((False, ValueError(f"{type(reply[1]).__name__}: {reply[1]}")))
+
+
+class _Worker:
+    def __init__(self):
+        self.conn, child = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=_serve, args=(child,), daemon=True)
+        self.process.start()
+        child.close()
+
+    def stop(self):
+        self.conn.close()
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.kill()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class _Task:
+    def __init__(self, pool, worker):
+        self.pool = pool
+        self.worker = worker
+        self.started = time.monotonic()
+
+    def result(self, budget):
+        # the budget runs from dispatch, not from when the task was queued
+        worker, self.worker = self.worker, None
+        try:
+            ready = worker.conn.poll(max(0.0, self.started + budget - time.monotonic()))
+            ok, value = worker.conn.recv() if ready else (None, None)
+        except (EOFError, OSError):
+            self.pool._discard(worker)
+            raise RuntimeError("PDF extraction worker died")
+        if not ready:
+            self.pool._discard(worker)
+            raise PdfTimedOut("PDF extraction exceeded its time budget")
+
+        self.pool._release(worker)
+        if not ok:
+            raise value
+        return value
+
+    def cancel(self):
+        if self.worker is not None:
+            self.pool._discard(self.worker)
+            self.worker = None
+
+
+class ExtractionPool:
+    # pypdf runs in worker processes because a thread stuck in a pathological page
+    # cannot be stopped; a process can. Each worker runs one task at a time, so a
+    # task past its deadline is killed without touching anybody else's
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self._idle = []
+        self._slots = threading.BoundedSemaphore(self.max_workers)
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def submit(self, data, start, stop, max_pages, wait=True):
+        # None when wait is false and every worker is busy
+        if not self._slots.acquire(blocking=wait):
+            return None
+        try:
+            with self._lock:
+                worker = self._idle.pop() if self._idle else None
+            if worker is None:
+                worker = _Worker()
+            worker.conn.send((data, start, stop, max_pages))
+        except BaseException:
+            self._slots.release()
+            raise
+        return _Task(self, worker)
 
-    for page in reader.pages:
-        text += page.extract_text() or ""
+    def _release(self, worker):
+        with self._lock:
+            closed = self._closed
+            if not closed:
+                self._idle.append(worker)
+        if closed:
+            worker.stop()
+        self._slots.release()
+
+    def _discard(self, worker):
+        worker.kill()
+        self._slots.release()
+
+    def shutdown(self):
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.stop()
+
+
+_MEMORY_CACHE = _TextCache(MEMORY_CACHE_SIZE)
+_POOL = ExtractionPool()
+
+
+def read_pdf_bytes(source) -> bytes:
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(source)
+    if hasattr(source, "getvalue"):
+        return source.getvalue()
+    if hasattr(source, "read"):
+        return source.read()
+    return Path(source).read_bytes()
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _extract_pages(data: bytes, start: int, stop: int, max_pages: int):
+    from pypdf import PdfReader
+
+    reader = PdfReader(io.BytesIO(data))
+    n_pages = len(reader.pages)
+    if n_pages > max_pages:
+        raise PdfBudgetExceeded(f"PDF has {n_pages} pages, limit is {max_pages}")
+    return n_pages, [reader.pages[i].extract_text() or "" for i in range(start, min(stop, n_pages))]
+
+
+def _iter_bounded(data, max_pages, time_budget, workers, pool):
+    # the first task counts the pages and extracts what one worker should; longer
+    # documents have the rest split across up to `workers` tasks, yielded in order
+    first = max_pages if workers == 1 else PARALLEL_MIN_PAGES
+    n_pages, pages = pool.submit(data, 0, first, max_pages).result(time_budget)
+    count("pdf_pages", n_pages)
+    yield from pages
+    if n_pages <= first:
+        return
+
+    workers = min(workers, pool.max_workers)
+    chunk = -(-(n_pages - first) // workers)
+    pending = deque()
+    try:
+        for start in range(first, n_pages, chunk):
+            # waiting for a worker while holding others could deadlock two documents;
+            # finish our own oldest task instead
+            task = pool.submit(data, start, start + chunk, max_pages, wait=not pending)
+            while task is None:
+                yield from pending.popleft().result(time_budget)[1]
+                task = pool.submit(data, start, start + chunk, max_pages, wait=not pending)
+            pending.append(task)
+
+        while pending:
+            yield from pending.popleft().result(time_budget)[1]
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def iter_pages(source, max_pages=MAX_PAGES, max_bytes=MAX_BYTES, time_budget=TIME_BUDGET, workers=None, pool=None):
+    data = read_pdf_bytes(source)
+    if len(data) > max_bytes:
+        raise PdfBudgetExceeded(f"PDF is {len(data)} bytes, limit is {max_bytes}")
+
+    if time_budget is None:
+        n_pages, pages = _extract_pages(data, 0, max_pages, max_pages)
+        count("pdf_pages", n_pages)
+        yield from pages
+        return
+
+    workers = workers or min(4, os.cpu_count() or 1)
+    yield from _iter_bounded(data, max_pages, time_budget, workers, pool or _POOL)
+
+
+_DISK_CACHES = {}
+_DISK_LOCK = threading.Lock()
+
+
+def _disk_cache(cache_dir):
+    key = str(cache_dir)
+    with _DISK_LOCK:
+        cache = _DISK_CACHES.get(key)
+        if cache is None:
+            cache = _DISK_CACHES[key] = _DiskCache(cache_dir)
+        return cache
+
+
+@timed("extract_text_from_pdf")
+def extract_text(source, cache_dir=CACHE_DIR, **budgets) -> str:
+    data = read_pdf_bytes(source)
+    key = content_hash(data)
+
+    count("documents")
+    count("pdf_bytes", len(data))
+
+    text = _MEMORY_CACHE.get(key)
+    if text is not None:
+        count("cache_hits", cache="text_memory")
+        return text
+
+    disk = _disk_cache(cache_dir) if cache_dir is not None else None
+    if disk is not None:
+        text = disk.get(key)
+        if text is not None:
+            count("cache_hits", cache="text_disk")
+            _MEMORY_CACHE.put(key, text)
+            return text
+
+    count("cache_misses", cache="text")
+    text = "".join(iter_pages(data, **budgets))
+
+    _MEMORY_CACHE.put(key, text)
+    if disk is not None:
+        disk.put(key, text)
 
     return text
+
+
+def extract_text_from_pdf(pdf_path: str) -> str:
+    return extract_text(pdf_path)
@@ -0,0 +1,208 @@
+import functools
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+PREFIX = "resume_analyzer"
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items())) if labels else ()
+
+
+def _format_labels(key, extra=None):
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    body = ",".join(f'{k}="{_escape(v)}"' for k, v in pairs)
+    return "{" + body + "}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+    __slots__ = ("buckets", "sum", "count")
+
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.sum += seconds
+        self.count += 1
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                break
+
+
+class Metrics:
+    def __init__(self):
+        self.enabled = False
+        self.counters = {}
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def incr(self, name, value=1, labels=None):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, seconds, labels=None):
+        key = (name, _label_key(labels))
+        with self._lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = Histogram()
+            hist.observe(seconds)
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "counters": [
+                    {"name": name, "labels": dict(key), "value": value}
+                    for (name, key), value in sorted(self.counters.items())
+                ],
+                "histograms": [
+                    {
+                        "name": name,
+                        "labels": dict(key),
+                        "count": hist.count,
+                        "sum_seconds": hist.sum,
+                        "buckets": dict(zip(map(str, BUCKETS), hist.buckets)),
+                    }
+                    for (name, key), hist in sorted(self.histograms.items())
+                ],
+            }
+
+    def prometheus(self):
+        lines = []
+        with self._lock:
+            for name in sorted({n for n, _ in self.counters}):
+                metric = f"{PREFIX}_{name}_total"
+                lines.append(f"# TYPE {metric} counter")
+                for (n, key), value in sorted(self.counters.items()):
+                    if n == name:
+                        lines.append(f"{metric}{_format_labels(key)} {value}")
+
+            for name in sorted({n for n, _ in self.histograms}):
+                metric = f"{PREFIX}_{name}_seconds"
+                lines.append(f"# TYPE {metric} histogram")
+                for (n, key), hist in sorted(self.histograms.items()):
+                    if n != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(BUCKETS, hist.buckets):
+                        cumulative += count
+                        lines.append(f"{metric}_bucket{_format_labels(key, ('le', bound))} {cumulative}")
+                    lines.append(f"{metric}_bucket{_format_labels(key, ('le', '+Inf'))} {hist.count}")
+                    lines.append(f"{metric}_sum{_format_labels(key)} {hist.sum}")
+                    lines.append(f"{metric}_count{_format_labels(key)} {hist.count}")
+
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Metrics()
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _Span:
+    __slots__ = ("name", "labels", "start")
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        METRICS.observe(self.name, time.perf_counter() - self.start, self.labels)
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def enable():
+    METRICS.enabled = True
+
+
+def disable():
+    METRICS.enabled = False
+
+
+def span(name, **labels):
+    if not METRICS.enabled:
+        return _NULL_SPAN
+    return _Span(name, labels)
+
+
+def timed(name):
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not METRICS.enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                METRICS.observe(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def count(name, value=1, **labels):
+    if METRICS.enabled:
+        METRICS.incr(name, value, labels)
+
+
+def write_metrics(path):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.suffix == ".json":
+        path.write_text(json.dumps(METRICS.snapshot(), indent=2), encoding="utf-8")
+    else:
+        path.write_text(METRICS.prometheus(), encoding="utf-8")
+    return path
+
+
+def push_metrics(url, fmt="prometheus", timeout=5):
+    import urllib.request
+
+    if fmt == "json":
+        body = json.dumps(METRICS.snapshot()).encode("utf-8")
+        content_type = "application/json"
+    else:
+        body = METRICS.prometheus().encode("utf-8")
+        content_type = "text/plain; version=0.0.4"
+
+    request = urllib.request.Request(url, data=body, method="POST", headers={"Content-Type": content_type})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return response.status
+
+
+if os.environ.get("RESUME_ANALYZER_METRICS", "").strip().lower() in ("1", "true", "yes", "on"):
+    enable()
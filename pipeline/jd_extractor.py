@@ -5,15 +5,18 @@ from pipeline.text_cleaner import clean_text
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = BASE_DIR / "data"
 OUTPUT_DIR = BASE_DIR / "outputs" / "cleaned_jds"
-OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
 
-def extract_and_clean_jd(file_path: Path) -> str:
-    text = file_path.read_text(encoding="utf-8")
+def clean_jd_text(text: str) -> str:
     return clean_text(text).lower()
 
 
+def extract_and_clean_jd(file_path: Path) -> str:
+    return clean_jd_text(file_path.read_text(encoding="utf-8"))
+
+
 def save_cleaned_jd(role: str, cleaned_text: str) -> Path:
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
     path = OUTPUT_DIR / f"{role}_cleaned.txt"
     path.write_text(cleaned_text, encoding="utf-8")
     return path
@@ -0,0 +1,407 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from array import array
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from pipeline.jd_extractor import BASE_DIR, clean_jd_text
+from pipeline.learned_roles import locked
+from pipeline.phrase_stats import PHRASE_INDEX_PATH, PhraseIndex, document_hashes, update_from_store
+
+STORE_DIR = BASE_DIR / "outputs" / "jd_store"
+STORE_LOCK = "store.lock"
+
+NUM_PERM = 128
+BANDS = 16
+SHINGLE = 4
+THRESHOLD = 0.8
+CHUNK_SIZE = 64
+
+EMPTY_SLOT = 0xFFFFFFFF
+ROTATION = 0x9E3779B1
+TEXT_FIELDS = ("text", "description", "jd", "body")
+
+
+def _file_signature(path):
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+def _record_text(record, text_field=None):
+    if text_field:
+        text = record.get(text_field)
+    else:
+        text = next((record[field] for field in TEXT_FIELDS if record.get(field)), None)
+    return text if isinstance(text, str) else None
+
+
+def iter_input_files(sources):
+    for source in sources:
+        source = Path(source)
+        if source.is_dir():
+            for path in sorted(source.rglob("*")):
+                if path.suffix in (".txt", ".jsonl") and path.is_file():
+                    yield path
+        else:
+            yield source
+
+
+def iter_documents(path, text_field=None):
+    if path.suffix != ".jsonl":
+        yield str(path), path.stem, path.read_text(encoding="utf-8", errors="replace")
+        return
+
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(record, dict):
+                continue
+
+            text = _record_text(record, text_field)
+            if not text:
+                continue
+
+            doc_id = record.get("id", line_no)
+            yield f"{path}#{doc_id}", record.get("title"), text
+
+
+def shingles(tokens, size=SHINGLE):
+    if len(tokens) < size:
+        grams = [" ".join(tokens)] if tokens else []
+    else:
+        grams = {" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+    return {int.from_bytes(hashlib.blake2b(g.encode("utf-8"), digest_size=8).digest(), "little")
+            for g in grams}
+
+
+def minhash(shingle_hashes, num_perm=NUM_PERM):
+    # one-permutation hashing: each shingle lands in one bin, so the cost is
+    # linear in the document instead of num_perm passes over it
+    signature = [EMPTY_SLOT] * num_perm
+    for x in shingle_hashes:
+        slot = x % num_perm
+        value = (x >> 32) & 0xFFFFFFFE
+        if value < signature[slot]:
+            signature[slot] = value
+
+    filled = [i for i, v in enumerate(signature) if v != EMPTY_SLOT]
+    if filled and len(filled) < num_perm:
+        # densify empty bins from the next filled one (rotation) so that
+        # near-identical documents still agree on them
+        original = signature[:]
+        next_filled = filled[0] + num_perm
+        for i in range(num_perm - 1, -1, -1):
+            if original[i] != EMPTY_SLOT:
+                next_filled = i
+                continue
+            distance = next_filled - i
+            signature[i] = (original[next_filled % num_perm] + distance * ROTATION) & 0xFFFFFFFF | 1
+
+    return array("I", signature)
+
+
+def similarity(sig_a, sig_b):
+    same = sum(1 for x, y in zip(sig_a, sig_b) if x == y)
+    return same / len(sig_a)
+
+
+def _clean_chunk(texts, num_perm=NUM_PERM):
+    results = []
+    for text in texts:
+        cleaned = clean_jd_text(text)
+        signature = minhash(shingles(cleaned.split()), num_perm)
+        results.append((cleaned, content_hash(cleaned), signature.tobytes(), document_hashes(cleaned).tobytes()))
+    return results
+
+
+def store_lock(root=STORE_DIR):
+    # held across opening a JDStore too: loading truncates the logs back to their
+    # last commit, which must not happen under another process's writes
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    return locked(root / STORE_LOCK)
+
+
+def _truncate(path, size):
+    if path.exists() and path.stat().st_size > size:
+        with open(path, "rb+") as f:
+            f.truncate(size)
+
+
+class JDStore:
+    def __init__(self, root=STORE_DIR, num_perm=NUM_PERM, bands=BANDS, threshold=THRESHOLD):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.jds_path = self.root / "jds.jsonl"
+        self.signatures_path = self.root / "signatures.bin"
+        self.seen_path = self.root / "seen.jsonl"
+        self.meta_path = self.root / "meta.json"
+        self.lock_path = self.root / STORE_LOCK
+
+        self.meta = {"sketch": "oph", "num_perm": num_perm, "bands": bands, "shingle": SHINGLE}
+        if self.meta_path.exists():
+            stored = json.loads(self.meta_path.read_text(encoding="utf-8"))
+            if stored != self.meta:
+                raise ValueError(f"{self.root} was built with {stored}, not {self.meta}")
+        else:
+            self.meta_path.write_text(json.dumps(self.meta), encoding="utf-8")
+
+        self.num_perm = num_perm
+        self.rows = num_perm // bands
+        self.threshold = threshold
+
+        self.inputs = {}
+        self.raw_hashes = set()
+        self.clean_hashes = {}
+        self.signatures = []
+        self.buckets = [defaultdict(list) for _ in range(bands)]
+        self._load()
+
+        self._jds = open(self.jds_path, "ab")
+        self._sigs = open(self.signatures_path, "ab")
+        self._seen = open(self.seen_path, "ab")
+        self._pending = []
+
+    def _load(self):
+        jds_end = 0
+        sig_size = self.num_perm * 4
+        # a crash can leave the seen log ahead of what reached the other two files;
+        # nothing from the first entry they cannot back up onwards is committed
+        jds_size = self.jds_path.stat().st_size if self.jds_path.exists() else 0
+        sigs_size = self.signatures_path.stat().st_size if self.signatures_path.exists() else 0
+
+        if self.seen_path.exists():
+            data = self.seen_path.read_bytes()
+            data = data[:data.rfind(b"\n") + 1]
+            committed = 0
+
+            for line in data.splitlines(keepends=True):
+                entry = json.loads(line)
+                if "input" in entry:
+                    self.inputs[entry["input"]] = entry["sig"]
+                elif entry["status"] == "kept" and (entry["end"] > jds_size
+                                                    or (entry["id"] + 1) * sig_size > sigs_size):
+                    break
+                else:
+                    self.raw_hashes.add(entry["raw_hash"])
+                    if entry["status"] == "kept":
+                        self.clean_hashes[entry["hash"]] = entry["id"]
+                        jds_end = entry["end"]
+                committed += len(line)
+
+            _truncate(self.seen_path, committed)
+
+        # the seen log is the commit record; drop anything written after its last entry
+        kept = len(self.clean_hashes)
+        _truncate(self.jds_path, jds_end)
+        _truncate(self.signatures_path, kept * sig_size)
+
+        if self.signatures_path.exists():
+            data = self.signatures_path.read_bytes()
+            for doc_id in range(kept):
+                self._index(doc_id, array("I", data[doc_id * sig_size:(doc_id + 1) * sig_size]))
+
+    def _band_keys(self, signature):
+        for band in range(len(self.buckets)):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def _index(self, doc_id, signature):
+        self.signatures.append(signature)
+        for band, key in self._band_keys(signature):
+            self.buckets[band][key].append(doc_id)
+
+    def near_duplicate_of(self, signature):
+        checked = set()
+        for band, key in self._band_keys(signature):
+            for doc_id in self.buckets[band].get(key, ()):
+                if doc_id in checked:
+                    continue
+                checked.add(doc_id)
+                if similarity(signature, self.signatures[doc_id]) >= self.threshold:
+                    return doc_id
+        return None
+
+    def _log(self, entry):
+        # held back until commit(), so the seen log never gets ahead of the data files
+        self._pending.append((json.dumps(entry) + "\n").encode("utf-8"))
+
+    def input_unchanged(self, path):
+        return self.inputs.get(str(path)) == _file_signature(path)
+
+    def mark_input(self, path):
+        key = str(path)
+        self.inputs[key] = _file_signature(path)
+        self._log({"input": key, "sig": self.inputs[key]})
+
+    def add(self, source, title, raw_hash, cleaned, clean_hash, signature):
+        entry = {"raw_hash": raw_hash, "source": source}
+
+        if not cleaned:
+            status = "empty"
+        elif clean_hash in self.clean_hashes:
+            status = "duplicate"
+            entry["of"] = self.clean_hashes[clean_hash]
+        else:
+            match = self.near_duplicate_of(signature)
+            if match is not None:
+                status = "near_duplicate"
+                entry["of"] = match
+            else:
+                status = "kept"
+
+        entry["status"] = status
+
+        if status == "kept":
+            doc_id = len(self.signatures)
+            record = {"id": doc_id, "source": source, "title": title, "hash": clean_hash, "text": cleaned}
+            self._jds.write((json.dumps(record) + "\n").encode("utf-8"))
+            self._sigs.write(signature.tobytes())
+            self._index(doc_id, signature)
+            self.clean_hashes[clean_hash] = doc_id
+            entry.update(id=doc_id, hash=clean_hash, end=self._jds.tell())
+
+        self._log(entry)
+        return status
+
+    def commit(self):
+        for f in (self._jds, self._sigs):
+            f.flush()
+            os.fsync(f.fileno())
+
+        self._seen.write(b"".join(self._pending))
+        self._pending.clear()
+        self._seen.flush()
+        os.fsync(self._seen.fileno())
+
+    def close(self):
+        self.commit()
+        for f in (self._jds, self._sigs, self._seen):
+            f.close()
+
+    def __len__(self):
+        return len(self.signatures)
+
+    def iter_jds(self):
+        self._jds.flush()
+        with open(self.jds_path, encoding="utf-8") as f:
+            for line in f:
+                yield json.loads(line)
+
+
+def _chunks(documents, size):
+    chunk = []
+    for doc in documents:
+        chunk.append(doc)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def ingest(sources, store_dir=STORE_DIR, workers=None, chunk_size=CHUNK_SIZE, text_field=None,
+           threshold=THRESHOLD):
+    workers = workers or os.cpu_count() or 1
+    stats = {"inputs": 0, "inputs_unchanged": 0, "documents": 0, "unchanged": 0,
+             "kept": 0, "duplicate": 0, "near_duplicate": 0, "empty": 0}
+    start = time.perf_counter()
+
+    with store_lock(store_dir):
+        store = JDStore(store_dir, threshold=threshold)
+
+        # phrase document frequencies for role_builder, kept in step with the kept JDs
+        phrases = PhraseIndex(store.root / PHRASE_INDEX_PATH.name, writable=True)
+        if phrases.docs < len(store):
+            update_from_store(store, phrases)
+
+        def pending_documents():
+            for path in iter_input_files(sources):
+                stats["inputs"] += 1
+                if store.input_unchanged(path):
+                    stats["inputs_unchanged"] += 1
+                    continue
+
+                for source, title, text in iter_documents(path, text_field):
+                    stats["documents"] += 1
+                    raw_hash = content_hash(text)
+                    if raw_hash in store.raw_hashes:
+                        stats["unchanged"] += 1
+                        continue
+                    store.raw_hashes.add(raw_hash)
+                    yield path, source, title, raw_hash, text
+
+                yield path, None, None, None, None
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            window = deque()
+
+            def drain_one():
+                chunk, future = window.popleft()
+                cleaned_docs = iter(future.result())
+                kept = []
+                for path, source, title, raw_hash, _ in chunk:
+                    if source is None:
+                        store.mark_input(path)
+                        continue
+                    cleaned, clean_hash, signature, phrase_hashes = next(cleaned_docs)
+                    status = store.add(source, title, raw_hash, cleaned, clean_hash, array("I", signature))
+                    stats[status] += 1
+                    if status == "kept":
+                        kept.append(np.frombuffer(phrase_hashes, dtype=np.uint64))
+                phrases.add_documents(kept)
+                store.commit()
+
+            for chunk in _chunks(pending_documents(), chunk_size):
+                texts = [text for _, source, _, _, text in chunk if source is not None]
+                window.append((chunk, pool.submit(_clean_chunk, texts, store.num_perm)))
+                if len(window) >= workers * 2:
+                    drain_one()
+
+            while window:
+                drain_one()
+
+        store.close()
+        phrases.save()
+
+    stats["stored"] = len(store)
+    stats["elapsed_sec"] = round(time.perf_counter() - start, 3)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Clean, deduplicate and store job descriptions in bulk.")
+    parser.add_argument("sources", nargs="+", help="directories of .txt/.jsonl files, or JSONL dumps")
+    parser.add_argument("--store", default=str(STORE_DIR), help="directory of the append-only JD store")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--text-field", help="JSONL field holding the JD text (default: first of "
+                                             + ", ".join(TEXT_FIELDS) + ")")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="estimated Jaccard similarity above which a JD counts as a near duplicate")
+    args = parser.parse_args(argv)
+
+    summary = ingest(args.sources, args.store, args.workers, args.chunk_size, args.text_field, args.threshold)
+    print(json.dumps(summary), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import json
+import os
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+LEARNED_PATH = BASE_DIR / "data" / "learned_roles.json"
+
+COMPACT_BYTES = 256 * 1024
+
+
+@contextmanager
+def locked(lock_path, shared=False):
+    with open(lock_path, "a+b") as f:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def atomic_write_json(path, data, indent=4):
+    import tempfile
+
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=indent)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, os.stat(path).st_mode if path.exists() else 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def complete_lines(data):
+    end = data.rfind(b"\n") + 1
+    return data[:end]
+
+
+def parse_entries(data):
+    entries = []
+    for line in data.splitlines():
+        if line.strip():
+            entries.append(json.loads(line))
+    return entries
+
+
+class LearnedRoleLog:
+    def __init__(self, snapshot_path=LEARNED_PATH):
+        self.snapshot_path = Path(snapshot_path)
+        self.log_path = self.snapshot_path.with_suffix(".log")
+        self.lock_path = self.snapshot_path.with_suffix(".lock")
+
+    def append(self, role, skills):
+        line = (json.dumps({"role": role, "skills": skills}) + "\n").encode("utf-8")
+
+        self.snapshot_path.parent.mkdir(exist_ok=True)
+
+        with locked(self.lock_path):
+            with open(self.log_path, "ab") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+                size = f.tell()
+
+        return size
+
+    def read_snapshot(self):
+        if not self.snapshot_path.exists():
+            return {}
+        with open(self.snapshot_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def read_log(self):
+        if not self.log_path.exists():
+            return b""
+        return complete_lines(self.log_path.read_bytes())
+
+    def compact(self):
+        with locked(self.lock_path):
+            roles = self.read_snapshot()
+            for entry in parse_entries(self.read_log()):
+                roles[entry["role"]] = entry["skills"]
+
+            atomic_write_json(self.snapshot_path, roles)
+            open(self.log_path, "wb").close()
+
+        return roles
+
+    def maybe_compact(self, log_size, max_bytes=COMPACT_BYTES):
+        if log_size >= max_bytes:
+            self.compact()
+            return True
+        return False
@@ -0,0 +1,61 @@
+import re
+
+from pipeline.skill_matcher import trie_pattern
+
+_SPACED_OUT_LINE = re.compile(r'^[^\S\n]*(?:[A-Za-z][^\S\n]+){3,}[A-Za-z][^\S\n]*$', re.M)
+_SINGLE_LETTER_GAP = re.compile(r'(?<=\b[a-z])\s+(?=[a-z]\b)')
+
+_KEPT = b"abcdefghijklmnopqrstuvwxyz0123456789+.# "
+_KEEP_TABLE = bytes(c if c in _KEPT else 32 for c in range(256))
+
+
+def repair_broken_spacing(text):
+    text = "\n".join(text.splitlines())
+    return _SPACED_OUT_LINE.sub(lambda m: m.group().replace(" ", ""), text)
+
+
+def normalize_tokens(text):
+    text = text.lower()
+    text = _SINGLE_LETTER_GAP.sub('', text)
+
+    # every non-ascii code point becomes "?", which the table then blanks out
+    return text.encode("ascii", "replace").translate(_KEEP_TABLE).decode("ascii").split()
+
+
+def normalize(text):
+    return " ".join(normalize_tokens(text))
+
+
+class NormalizedDocument:
+    __slots__ = ("repaired", "tokens", "text")
+
+    def __init__(self, text):
+        self.repaired = repair_broken_spacing(text)
+        self.tokens = normalize_tokens(self.repaired)
+        self.text = " ".join(self.tokens)
+
+
+class AliasTable:
+    # spelling and vendor variants ("k8s", "sci kit learn") compiled into one trie regex,
+    # so a single pass over normalized text rewrites them to their canonical skill at a
+    # cost that does not grow with the size of the table
+    __slots__ = ("aliases", "pattern")
+
+    def __init__(self, aliases, normalize_text=None):
+        normalize_text = normalize_text or normalize
+        self.aliases = {}
+        for variant, canonical in aliases.items():
+            key = normalize_text(variant).strip()
+            value = normalize_text(canonical).strip()
+            if key and key != value:
+                self.aliases[key] = value
+
+        # whole words only: "my sql" is an alias, "dummy sql" is not
+        self.pattern = None
+        if self.aliases:
+            self.pattern = re.compile(rf'(?<![a-z0-9])(?:{trie_pattern(self.aliases)})(?![a-z0-9])')
+
+    def rewrite(self, text):
+        if self.pattern is None:
+            return text
+        return self.pattern.sub(lambda m: self.aliases[m.group()], text)
@@ -0,0 +1,199 @@
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+from pipeline.learned_roles import LearnedRoleLog, complete_lines, locked, parse_entries
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = BASE_DIR / "data"
+SKILLS_PATH = DATA_DIR / "skills.json"
+LEARNED_PATH = DATA_DIR / "learned_roles.json"
+
+LEARNED_KEYWORDS = 6
+
+
+def _file_signature(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+def _read_bytes(path, offset=0):
+    try:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            return f.read()
+    except FileNotFoundError:
+        return b""
+
+
+class Ontology:
+    def __init__(self, config, learned, version):
+        self.version = version
+        self.config = config
+        self.role_aliases = config["role_aliases"]
+        self.skill_aliases = config.get("skill_aliases", {})
+        self.derived_skills = config.get("derived_skills", {})
+
+        self.skills_dictionary = dict(config["skills_dictionary"])
+        self.role_keywords = dict(config.get("role_keywords", {}))
+        self.learned_roles = {}
+        self._add_learned(learned)
+
+        self._derived = {}
+        # builders may ask for other derived structures (the matcher needs the skill graph)
+        self._lock = threading.RLock()
+
+    def _add_learned(self, learned):
+        curated = self.config["skills_dictionary"]
+        for role, skills in learned.items():
+            self.learned_roles[role] = skills
+            # hand-maintained definitions in skills.json win over learned ones
+            if role in curated:
+                continue
+            self.skills_dictionary[role] = skills
+            self.role_keywords[role] = skills["core"][:LEARNED_KEYWORDS]
+
+    def with_learned(self, learned, version):
+        ontology = Ontology(self.config, self.learned_roles, version)
+        ontology._add_learned(learned)
+        return ontology
+
+    def derived(self, name, builder):
+        value = self._derived.get(name)
+        if value is None:
+            with self._lock:
+                value = self._derived.get(name)
+                if value is None:
+                    value = self._derived[name] = builder(self)
+        return value
+
+
+def source_fingerprint(names):
+    h = hashlib.sha256()
+    for name in names:
+        h.update(_read_bytes(Path(__file__).with_name(name)))
+    return h.hexdigest()[:16]
+
+
+def _learned_from_entries(entries):
+    learned = {}
+    for entry in entries:
+        learned[entry["role"]] = entry["skills"]
+    return learned
+
+
+class OntologyStore:
+    def __init__(self, skills_path=SKILLS_PATH, learned_path=LEARNED_PATH):
+        self.skills_path = Path(skills_path)
+        self.learned_log = LearnedRoleLog(learned_path)
+
+        self._signature = None
+        self._ontology = None
+        self._hasher = None
+        self._log_offset = 0
+        self._lock = threading.Lock()
+
+    def _current_signature(self):
+        return (
+            _file_signature(self.skills_path),
+            _file_signature(self.learned_log.snapshot_path),
+            _file_signature(self.learned_log.log_path),
+        )
+
+    def get(self):
+        signature = self._current_signature()
+        if signature == self._signature:
+            return self._ontology
+
+        with self._lock:
+            if signature != self._signature:
+                self._refresh(signature)
+            return self._ontology
+
+    def _refresh(self, signature):
+        if self._signature is not None and self._signature[:2] == signature[:2]:
+            log_sig = signature[2]
+            old_log_sig = self._signature[2]
+            if (log_sig and old_log_sig and log_sig[0] == old_log_sig[0]
+                    and log_sig[2] >= self._log_offset):
+                if self._tail_log():
+                    self._signature = signature
+                    return
+
+        if self._reload():
+            self._signature = signature
+
+    def _tail_log(self):
+        data = complete_lines(_read_bytes(self.learned_log.log_path, self._log_offset))
+
+        # a compaction may have swapped the snapshot while we were reading
+        if _file_signature(self.learned_log.snapshot_path) != self._signature[1]:
+            return False
+
+        if not data:
+            return True
+
+        hasher = self._hasher.copy()
+        hasher.update(data)
+        learned = _learned_from_entries(parse_entries(data))
+
+        self._ontology = self._ontology.with_learned(learned, hasher.hexdigest()[:16])
+        self._hasher = hasher
+        self._log_offset += len(data)
+        return True
+
+    def _read_learned(self):
+        log = self.learned_log.read_log()
+        snapshot_raw = _read_bytes(self.learned_log.snapshot_path)
+        return snapshot_raw, log
+
+    def _reload(self):
+        skills_raw = _read_bytes(self.skills_path)
+
+        if self.learned_log.lock_path.exists():
+            with locked(self.learned_log.lock_path, shared=True):
+                snapshot_raw, log = self._read_learned()
+        else:
+            snapshot_raw, log = self._read_learned()
+
+        hasher = hashlib.sha256(skills_raw + b"\0" + snapshot_raw + b"\0")
+        hasher.update(log)
+        version = hasher.hexdigest()[:16]
+
+        if self._ontology is None or self._ontology.version != version:
+            try:
+                config = json.loads(skills_raw)
+                learned = json.loads(snapshot_raw) if snapshot_raw.strip() else {}
+                learned.update(_learned_from_entries(parse_entries(log)))
+            except ValueError:
+                # a writer is mid-way through a rewrite; keep serving the last good version
+                if self._ontology is None:
+                    raise
+                return False
+            self._ontology = Ontology(config, learned, version)
+
+        self._hasher = hasher
+        self._log_offset = len(log)
+        return True
+
+
+_STORE = OntologyStore()
+
+
+def configure_ontology(skills_path=SKILLS_PATH, learned_path=LEARNED_PATH):
+    global _STORE
+    _STORE = OntologyStore(skills_path, learned_path)
+    return _STORE
+
+
+def get_ontology():
+    return _STORE.get()
+
+
+def get_learned_log():
+    return _STORE.learned_log
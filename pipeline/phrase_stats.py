@@ -0,0 +1,239 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import struct
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from pipeline.jd_extractor import BASE_DIR, clean_jd_text
+
+PHRASE_INDEX_PATH = BASE_DIR / "outputs" / "jd_store" / "phrases.cms"
+PHRASE_MAGIC = b"phrasecms"
+
+# count-min sketch of document frequencies: memory is fixed at DEPTH * WIDTH
+# counters however many JDs or distinct phrases go in
+WIDTH = 1 << 20
+DEPTH = 4
+MAX_WORDS = 3
+MIN_WORD = 3
+MIN_SINGLE_WORD = 5
+
+STOPWORDS = {
+    "with","and","the","for","from","that","this","will","have","has","are","was",
+    "were","but","not","you","your","our","their","they","them","such","able",
+    "seeking","looking","responsible","knowledgeable","dedicated","strong","excellent",
+    "good","high","new","all","any","other","more","less","very","use","using",
+    "experience","skills","work","working","team","role","job","position"
+}
+
+# runs of plain words; digits, punctuation and short words end a phrase
+_RUN = re.compile(r'[a-z]{%d,}(?: [a-z]{%d,})*' % (MIN_WORD, MIN_WORD))
+_HEADER = struct.Struct("<9sxxxIIQ")
+
+
+def candidate_phrases(cleaned_jd):
+    phrases = []
+    for run in _RUN.findall(cleaned_jd):
+        words = run.split()
+        for start, first in enumerate(words):
+            if first in STOPWORDS:
+                continue
+            for size in range(1, MAX_WORDS + 1):
+                gram = words[start:start + size]
+                if len(gram) < size or gram[-1] in STOPWORDS:
+                    break
+                if size == 1 and len(first) < MIN_SINGLE_WORD:
+                    continue
+                phrases.append(" ".join(gram))
+    return phrases
+
+
+def phrase_hashes(phrases):
+    return np.array(
+        [int.from_bytes(hashlib.blake2b(p.encode("utf-8"), digest_size=8).digest(), "little") for p in phrases],
+        dtype=np.uint64,
+    )
+
+
+def document_hashes(cleaned_jd):
+    return np.unique(phrase_hashes(set(candidate_phrases(cleaned_jd))))
+
+
+def _cells(hashes, width):
+    low = hashes & np.uint64(0xFFFFFFFF)
+    step = (hashes >> np.uint64(32)) | np.uint64(1)
+    return [((low + np.uint64(row) * step) % np.uint64(width)).astype(np.int64) for row in range(DEPTH)]
+
+
+class PhraseIndex:
+    def __init__(self, path=PHRASE_INDEX_PATH, width=WIDTH, writable=False):
+        self.path = Path(path)
+        self.width = width
+        self.docs = 0
+
+        if self.path.exists():
+            with open(self.path, "rb") as f:
+                magic, depth, self.width, self.docs = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != PHRASE_MAGIC or depth != DEPTH:
+                raise ValueError(f"{self.path} is not a phrase index")
+            if writable:
+                table = np.fromfile(self.path, dtype=np.uint32, count=DEPTH * self.width, offset=_HEADER.size)
+            else:
+                table = np.memmap(self.path, dtype=np.uint32, mode="r", offset=_HEADER.size,
+                                  shape=(DEPTH * self.width,))
+            self.table = table.reshape(DEPTH, self.width)
+        else:
+            self.table = np.zeros((DEPTH, self.width), dtype=np.uint32)
+
+    def add_documents(self, hash_arrays):
+        if not hash_arrays:
+            return
+        # each array holds one JD's distinct phrases, so a counter gains at most one per JD
+        hashes = np.concatenate(hash_arrays)
+        for row, cells in enumerate(_cells(hashes, self.width)):
+            np.add.at(self.table[row], cells, 1)
+        self.docs += len(hash_arrays)
+
+    def document_frequency(self, phrases):
+        if not len(phrases):
+            return np.zeros(0, dtype=np.int64)
+        cells = _cells(phrase_hashes(phrases), self.width)
+        return np.min([self.table[row][c] for row, c in enumerate(cells)], axis=0).astype(np.int64)
+
+    def idf(self, phrases):
+        df = self.document_frequency(phrases)
+        return np.log((self.docs + 1) / (df + 1)) + 1
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, prefix=self.path.name + ".")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(_HEADER.pack(PHRASE_MAGIC, DEPTH, self.width, self.docs))
+                f.write(np.ascontiguousarray(self.table, dtype=np.uint32).tobytes())
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, self.path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+
+_CACHED = {}
+
+
+def get_phrase_index(path=PHRASE_INDEX_PATH):
+    # reopened whenever an ingest run replaces the file
+    path = Path(path)
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+
+    signature = (st.st_ino, st.st_mtime_ns, st.st_size)
+    cached = _CACHED.get(path)
+    if cached is None or cached[0] != signature:
+        cached = _CACHED[path] = (signature, PhraseIndex(path))
+    return cached[1]
+
+
+def rank_phrases(jd_text, index=None, limit=20):
+    phrases = candidate_phrases(clean_jd_text(jd_text))
+    if not phrases:
+        return []
+
+    counts = {}
+    for phrase in phrases:
+        counts[phrase] = counts.get(phrase, 0) + 1
+
+    # a phrase that only ever occurs inside a longer one ("machine" in
+    # "machine learning") gives way to it
+    nested = set()
+    for phrase, count in counts.items():
+        words = phrase.split()
+        for size in range(1, len(words)):
+            for start in range(len(words) - size + 1):
+                part = " ".join(words[start:start + size])
+                if counts.get(part) == count:
+                    nested.add(part)
+    unique = [p for p in counts if p not in nested]
+
+    if index is None or index.docs == 0:
+        weights = np.ones(len(unique))
+    else:
+        weights = index.idf(unique)
+
+    # tf-idf, earlier phrases first on ties
+    scores = [counts[p] * w for p, w in zip(unique, weights)]
+    order = sorted(range(len(unique)), key=lambda i: (-scores[i], i))
+
+    chosen = []
+    for i in order:
+        phrase = unique[i]
+        # "machine learning" makes "machine" and "machine learning models" redundant
+        padded = f" {phrase} "
+        if any(f" {c} " in padded or padded in f" {c} " for c in chosen):
+            continue
+        chosen.append(phrase)
+        if len(chosen) == limit:
+            break
+
+    return chosen
+
+
+def update_from_store(store, index):
+    added = 0
+    batch = []
+    for record in store.iter_jds():
+        if record["id"] < index.docs:
+            continue
+        batch.append(document_hashes(record["text"]))
+        if len(batch) >= 1024:
+            index.add_documents(batch)
+            added += len(batch)
+            batch = []
+    index.add_documents(batch)
+    return added + len(batch)
+
+
+def main(argv=None):
+    from pipeline.jd_ingest import STORE_DIR, JDStore, store_lock
+
+    parser = argparse.ArgumentParser(description="Phrase document frequencies over the ingested JD corpus.")
+    parser.add_argument("--index", default=str(PHRASE_INDEX_PATH))
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    update = sub.add_parser("update", help="add JDs from the store that the index has not seen yet")
+    update.add_argument("--store", default=str(STORE_DIR))
+
+    rank = sub.add_parser("rank", help="most distinctive phrases of a JD file")
+    rank.add_argument("jd_file")
+    rank.add_argument("--limit", type=int, default=20)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "update":
+        with store_lock(args.store):
+            store = JDStore(args.store)
+            index = PhraseIndex(args.index, writable=True)
+            try:
+                added = update_from_store(store, index)
+            finally:
+                store.close()
+            index.save()
+        print(json.dumps({"added": added, "documents": index.docs}), file=sys.stderr)
+    else:
+        jd_text = Path(args.jd_file).read_text(encoding="utf-8", errors="replace")
+        index = get_phrase_index(args.index)
+        phrases = rank_phrases(jd_text, index, args.limit)
+        df = index.document_frequency(phrases) if index else [None] * len(phrases)
+        for phrase, count in zip(phrases, df):
+            print(json.dumps({"phrase": phrase, "df": None if count is None else int(count)}))
+
+
+if __name__ == "__main__":
+    main()
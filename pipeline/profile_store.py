@@ -0,0 +1,334 @@
+import argparse
+import hashlib
+import json
+import sqlite3
+import sys
+import threading
+import zlib
+from pathlib import Path
+
+from pipeline.full_resume_extractor import content_hash, extract_text, read_pdf_bytes
+from pipeline.instrumentation import count, timed
+from pipeline.ontology import BASE_DIR, get_ontology, source_fingerprint
+from pipeline.skill_engine import (
+    apply_best_verdict,
+    get_role_layouts,
+    get_skill_matcher,
+    no_suitable_role,
+    normalize_skill,
+    scan_normalized,
+    score_role,
+)
+from pipeline.role_result import decode_results, encode_results
+from pipeline.sections import SectionedDocument
+from pipeline.skill_graph import get_skill_graph
+from pipeline.skill_matcher import SkillHits, SkillMatcher
+
+PROFILE_DB = BASE_DIR / "outputs" / "profiles.sqlite"
+
+# hits and scores computed by older matching/scoring code are not comparable
+SCORING_SOURCES = ("skill_matcher.py", "skill_engine.py", "normalizer.py", "role_result.py", "sections.py")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    hash TEXT PRIMARY KEY,
+    source TEXT,
+    resume_text BLOB NOT NULL,
+    project_text BLOB NOT NULL,
+    hits TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS scores (
+    hash TEXT NOT NULL,
+    role TEXT NOT NULL,
+    score REAL NOT NULL,
+    result BLOB NOT NULL,
+    PRIMARY KEY (hash, role)
+);
+CREATE INDEX IF NOT EXISTS scores_by_role ON scores (role, score);
+CREATE TABLE IF NOT EXISTS roles (role TEXT PRIMARY KEY, fingerprint TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS vocabulary (term TEXT NOT NULL, kind TEXT NOT NULL, PRIMARY KEY (term, kind));
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+
+def role_fingerprint(role, ontology):
+    source = ontology.role_aliases.get(role, role)
+    target = ontology.skills_dictionary[role]
+    skills = ontology.skills_dictionary[source]
+    evidence = get_skill_graph(ontology).evidence
+
+    definition = {"source": source, "target": target, "skills": {}}
+    for tier in ("core", "preferred", "tools"):
+        for skill in skills[tier]:
+            skill_norm = normalize_skill(skill, ontology)
+            definition["skills"][skill] = [skill_norm, sorted(evidence.get(skill_norm, {}).items())]
+
+    blob = json.dumps(definition, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()[:16]
+
+
+def _hits(skills, triggers):
+    hits = SkillHits()
+    for skill in skills:
+        hits.skills[skill] = []
+    for trigger in triggers:
+        hits.triggers[trigger] = []
+    return hits
+
+
+class Profile:
+    __slots__ = ("hash", "resume_skills", "resume_triggers", "project_skills", "project_triggers")
+
+    def __init__(self, content_hash, hits=None):
+        hits = hits or {}
+        self.hash = content_hash
+        self.resume_skills = set(hits.get("resume_skills", ()))
+        self.resume_triggers = set(hits.get("resume_triggers", ()))
+        self.project_skills = set(hits.get("project_skills", ()))
+        self.project_triggers = set(hits.get("project_triggers", ()))
+
+    def merge(self, resume_hits, project_hits):
+        self.resume_skills.update(resume_hits.skills)
+        self.resume_triggers.update(resume_hits.triggers)
+        self.project_skills.update(project_hits.skills)
+        self.project_triggers.update(project_hits.triggers)
+
+    def to_json(self):
+        return json.dumps({
+            "resume_skills": sorted(self.resume_skills),
+            "resume_triggers": sorted(self.resume_triggers),
+            "project_skills": sorted(self.project_skills),
+            "project_triggers": sorted(self.project_triggers),
+        })
+
+    def skill_hits(self):
+        return (
+            _hits(self.resume_skills, self.resume_triggers),
+            _hits(self.project_skills, self.project_triggers),
+        )
+
+
+class ProfileStore:
+    def __init__(self, db_path=PROFILE_DB):
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(db_path), timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+        self._lock = threading.RLock()
+
+    def close(self):
+        self._db.close()
+
+    def _meta(self, key):
+        row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def _score(self, profile, roles, ontology):
+        resume_hits, project_hits = profile.skill_hits()
+        rows = []
+        for role in roles:
+            result = score_role(resume_hits, project_hits, role, ontology)
+            if result is not None:
+                rows.append((profile.hash, role, result["score"], encode_results([result], layouts=False)))
+
+        self._db.executemany("DELETE FROM scores WHERE hash = ? AND role = ?", [(profile.hash, r) for r in roles])
+        self._db.executemany("INSERT INTO scores (hash, role, score, result) VALUES (?, ?, ?, ?)", rows)
+        count("profile_pairs_scored", len(roles))
+
+    def __contains__(self, content_hash):
+        return self._db.execute("SELECT 1 FROM profiles WHERE hash = ?", (content_hash,)).fetchone() is not None
+
+    def __len__(self):
+        return self._db.execute("SELECT COUNT(*) FROM profiles").fetchone()[0]
+
+    @timed("profile_add")
+    def add(self, source, name=None):
+        data = read_pdf_bytes(source)
+        key = content_hash(data)
+
+        with self._lock:
+            self.sync(get_ontology())
+            if key in self:
+                return key
+
+        raw_text = extract_text(data)
+        return self.add_text(raw_text, name or (str(source) if not isinstance(source, bytes) else None), key)
+
+    def add_text(self, raw_text, name=None, key=None):
+        key = key or content_hash(raw_text.encode("utf-8", "surrogatepass"))
+        doc = SectionedDocument(raw_text)
+        resume_text = doc.text
+        # one project section per line, so that no match runs from one into the next
+        project_text = "\n".join(resume_text[start:end] for start, end in doc.spans("projects"))
+
+        with self._lock:
+            ontology = get_ontology()
+            self.sync(ontology)
+            profile = Profile(key)
+            profile.merge(scan_normalized(resume_text, ontology), scan_normalized(project_text, ontology))
+
+            self._db.execute(
+                "INSERT OR REPLACE INTO profiles (hash, source, resume_text, project_text, hits) VALUES (?, ?, ?, ?, ?)",
+                (key, name, zlib.compress(resume_text.encode("utf-8")), zlib.compress(project_text.encode("utf-8")),
+                 profile.to_json()),
+            )
+            self._score(profile, list(ontology.skills_dictionary), ontology)
+            self._db.commit()
+
+        return key
+
+    def _iter_profiles(self, with_text=False):
+        columns = "hash, hits, resume_text, project_text" if with_text else "hash, hits"
+        for row in self._db.execute(f"SELECT {columns} FROM profiles ORDER BY rowid").fetchall():
+            profile = Profile(row[0], json.loads(row[1]))
+            if with_text:
+                yield profile, zlib.decompress(row[2]).decode("utf-8"), zlib.decompress(row[3]).decode("utf-8")
+            else:
+                yield profile
+
+    def profiles(self):
+        with self._lock:
+            return list(self._iter_profiles())
+
+    def score_rows(self):
+        with self._lock:
+            return self._db.execute("SELECT hash, role, score FROM scores").fetchall()
+
+    @timed("profile_sync")
+    def sync(self, ontology=None):
+        ontology = ontology or get_ontology()
+        # stored text is kept free of aliases, so a changed alias table can move hits
+        # anywhere and counts like a change to the scanning code
+        aliases = hashlib.sha256(json.dumps(ontology.skill_aliases, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+        code = f"{source_fingerprint(SCORING_SOURCES)} {aliases}"
+        stats = {"rescanned_terms": 0, "rescored_roles": 0, "removed_roles": 0}
+
+        with self._lock:
+            if self._meta("ontology_version") == ontology.version and self._meta("code") == code:
+                return stats
+
+            code_changed = self._meta("code") != code
+            matcher = get_skill_matcher(ontology)
+
+            known = {(t, k) for t, k in self._db.execute("SELECT term, kind FROM vocabulary")}
+            if code_changed:
+                known = set()
+            new_skills = {s for s in matcher.skills if (s, "skill") not in known}
+            new_triggers = {t for t in matcher.triggers if (t, "trigger") not in known}
+
+            stats["rescanned_terms"] = len(new_skills) + len(new_triggers)
+
+            if new_skills or new_triggers:
+                if code_changed:
+                    self._db.execute("DELETE FROM vocabulary")
+                scanner = SkillMatcher(new_skills, new_triggers)
+                for profile, resume_text, project_text in self._iter_profiles(with_text=True):
+                    if code_changed:
+                        profile = Profile(profile.hash)
+                    profile.merge(scan_normalized(resume_text, ontology, scanner),
+                                  scan_normalized(project_text, ontology, scanner))
+                    self._db.execute("UPDATE profiles SET hits = ? WHERE hash = ?", (profile.to_json(), profile.hash))
+
+                self._db.executemany("INSERT OR IGNORE INTO vocabulary (term, kind) VALUES (?, 'skill')",
+                                     [(s,) for s in new_skills])
+                self._db.executemany("INSERT OR IGNORE INTO vocabulary (term, kind) VALUES (?, 'trigger')",
+                                     [(t,) for t in new_triggers])
+
+            stored = dict(self._db.execute("SELECT role, fingerprint FROM roles"))
+            current = {role: role_fingerprint(role, ontology) for role in ontology.skills_dictionary}
+
+            changed = [r for r in current if code_changed or stored.get(r) != current[r]]
+            removed = [r for r in stored if r not in current]
+
+            if changed:
+                for profile in self._iter_profiles():
+                    self._score(profile, changed, ontology)
+
+            self._db.executemany("DELETE FROM scores WHERE role = ?", [(r,) for r in removed])
+            self._db.executemany("DELETE FROM roles WHERE role = ?", [(r,) for r in removed])
+            self._db.executemany("INSERT OR REPLACE INTO roles (role, fingerprint) VALUES (?, ?)",
+                                 [(r, current[r]) for r in changed])
+
+            self._set_meta("ontology_version", ontology.version)
+            self._set_meta("code", code)
+            self._db.commit()
+
+            stats["rescored_roles"] = len(changed)
+            stats["removed_roles"] = len(removed)
+            count("profile_roles_rescored", len(changed))
+
+        return stats
+
+    def results(self, content_hash, roles=None):
+        ontology = get_ontology()
+        self.sync(ontology)
+        roles = list(ontology.skills_dictionary) if roles is None else list(roles)
+        order = {role: i for i, role in enumerate(roles)}
+
+        with self._lock:
+            rows = self._db.execute("SELECT role, result FROM scores WHERE hash = ?", (content_hash,)).fetchall()
+
+        # sync() has just re-scored every role whose definition changed, so the
+        # current layouts are the ones each row was scored against
+        layouts = get_role_layouts(ontology)
+        results = [decode_results(blob, layouts)[0]
+                   for role, blob in sorted(rows, key=lambda r: order.get(r[0], -1)) if role in order]
+        if not results:
+            return [no_suitable_role()]
+
+        results.sort(key=lambda x: x["score"], reverse=True)
+        apply_best_verdict(results[0])
+        return results
+
+    def top_candidates(self, role, n=10):
+        self.sync()
+        with self._lock:
+            return self._db.execute(
+                "SELECT p.hash, p.source, s.score FROM scores s JOIN profiles p ON p.hash = s.hash "
+                "WHERE s.role = ? ORDER BY s.score DESC, p.rowid LIMIT ?",
+                (role, n),
+            ).fetchall()
+
+
+def main(argv=None):
+    from pipeline.batch import collect_inputs
+
+    parser = argparse.ArgumentParser(description="Keep skill profiles of analyzed resumes up to date.")
+    parser.add_argument("--db", default=str(PROFILE_DB))
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    add = sub.add_parser("add", help="extract and profile PDFs (already known content is skipped)")
+    add.add_argument("source", help="directory of PDFs or manifest file")
+
+    sub.add_parser("sync", help="re-score stored profiles after an ontology change")
+
+    top = sub.add_parser("top", help="best stored candidates for a role")
+    top.add_argument("role")
+    top.add_argument("-n", type=int, default=10)
+
+    args = parser.parse_args(argv)
+    store = ProfileStore(args.db)
+
+    try:
+        if args.command == "add":
+            for path in collect_inputs(args.source):
+                try:
+                    store.add(path)
+                except Exception as e:
+                    print(f"skipping {path}: {type(e).__name__}: {e}", file=sys.stderr)
+            print(json.dumps({"profiles": len(store)}), file=sys.stderr)
+        elif args.command == "sync":
+            print(json.dumps(store.sync()), file=sys.stderr)
+        else:
+            for key, source, score in store.top_candidates(args.role, args.n):
+                print(json.dumps({"hash": key, "source": source, "score": score}))
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import argparse
+import io
+import json
+import os
+import sys
+import threading
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from pipeline.instrumentation import timed
+from pipeline.skill_engine import generate_learning_plan
+
+_STYLES = None
+_STYLES_LOCK = threading.Lock()
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+
+def _get_styles():
+    global _STYLES
+    with _STYLES_LOCK:
+        if _STYLES is None:
+            from reportlab.lib.styles import getSampleStyleSheet
+
+            styles = getSampleStyleSheet()
+            _STYLES = {name: styles[name] for name in ("Title", "Heading2", "BodyText")}
+        return _STYLES
+
+
+def _get_pool():
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="reports")
+        return _POOL
+
+
+def report_stem(now=None):
+    return f"career_report_{(now or datetime.now()).strftime('%Y%m%d_%H%M%S')}"
+
+
+def render_txt_report(result) -> bytes:
+    return f"Role: {result['role']}\nScore: {result['score']}%\nVerdict: {result['verdict']}\n".encode("utf-8")
+
+
+@timed("generate_pdf_report")
+def render_pdf_report(result) -> bytes:
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+
+    styles = _get_styles()
+    story = [
+        Paragraph("Career Fit Report", styles["Title"]),
+        Paragraph(f"Role: {result['role']}", styles["Heading2"]),
+        Paragraph(f"Score: {result['score']}%", styles["BodyText"]),
+        Paragraph(f"Verdict: {result['verdict']}", styles["BodyText"]),
+        Spacer(1, 12),
+    ]
+
+    for step in generate_learning_plan(result["report"]):
+        story.append(Paragraph(step, styles["BodyText"]))
+
+    buffer = io.BytesIO()
+    SimpleDocTemplate(buffer).build(story)
+    return buffer.getvalue()
+
+
+def render_reports(result):
+    return {"txt": render_txt_report(result), "pdf": render_pdf_report(result)}
+
+
+def submit_reports(result):
+    return _get_pool().submit(render_reports, result)
+
+
+def _render_chunk(chunk):
+    return [(name, render_reports(result)) for name, result in chunk]
+
+
+def _render_window(pool, items, chunksize, max_in_flight):
+    # pool.map would take the whole iterable up front; keep only a window of chunks
+    # (and their rendered reports) in memory, yielded in input order
+    window = deque()
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= chunksize:
+            window.append(pool.submit(_render_chunk, chunk))
+            chunk = []
+            if len(window) >= max_in_flight:
+                yield from window.popleft().result()
+    if chunk:
+        window.append(pool.submit(_render_chunk, chunk))
+    while window:
+        yield from window.popleft().result()
+
+
+def render_bulk(items, output, workers=None, chunksize=16):
+    output = Path(output)
+    count = 0
+    workers = workers or os.cpu_count() or 1
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        rendered = _render_window(pool, items, chunksize, workers * 2)
+
+        if output.suffix == ".zip":
+            output.parent.mkdir(parents=True, exist_ok=True)
+            with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as archive:
+                for name, files in rendered:
+                    for suffix, data in files.items():
+                        archive.writestr(f"{name}.{suffix}", data)
+                    count += 1
+        else:
+            output.mkdir(parents=True, exist_ok=True)
+            for name, files in rendered:
+                for suffix, data in files.items():
+                    (output / f"{name}.{suffix}").write_bytes(data)
+                count += 1
+
+    return count
+
+
+def iter_batch_results(jsonl_path):
+    seen = {}
+    with open(jsonl_path, encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            if "error" in record:
+                continue
+
+            name = Path(record["path"]).stem
+            seen[name] = seen.get(name, 0) + 1
+            if seen[name] > 1:
+                name = f"{name}_{seen[name]}"
+
+            yield name, record["results"][0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render reports for every resume in a batch result file.")
+    parser.add_argument("results", help="JSONL written by python -m pipeline.batch")
+    parser.add_argument("output", help="zip archive (*.zip) or directory for the rendered reports")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    count = render_bulk(iter_batch_results(args.results), args.output, workers=args.workers)
+    print(f"Rendered {count} reports to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from pipeline.instrumentation import count
+from pipeline.ontology import get_ontology
+from pipeline.role_result import RESULTS_MAGIC, decode_results, encode_results
+from pipeline.sections import SectionedDocument
+from pipeline.skill_engine import evaluate_multiple_roles, get_role_layouts
+
+MEMORY_BYTES = 64 * 1024 * 1024
+DB_BYTES = 1024 * 1024 * 1024
+STALE_AGE = 7 * 24 * 3600
+GC_EVERY = 1024
+
+
+def resume_fingerprint(cleaned_resume, raw_resume):
+    # everything prepare_resume_hits scores: the text and where its projects are
+    doc = SectionedDocument(raw_resume or cleaned_resume)
+
+    h = hashlib.sha256()
+    h.update(doc.text.encode("utf-8"))
+    h.update(b"\0")
+    h.update(repr(doc.spans("projects")).encode("ascii"))
+    return h.hexdigest()
+
+
+def cache_key(fingerprint, version, roles):
+    roles_hash = hashlib.sha256("\n".join(roles).encode("utf-8")).hexdigest()[:16]
+    return f"{version}:{fingerprint}:{roles_hash}"
+
+
+class ResultCache:
+    def __init__(self, max_bytes=MEMORY_BYTES, db_path=None, db_max_bytes=DB_BYTES, stale_age=STALE_AGE):
+        self.max_bytes = max_bytes
+        self.db_path = db_path
+        self.db_max_bytes = db_max_bytes
+        self.stale_age = stale_age
+
+        self._entries = OrderedDict()
+        self._size = 0
+        self._version = None
+        self._lock = threading.Lock()
+        self._db = None
+        self._puts = 0
+
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+        if db_path is not None:
+            self._db = sqlite3.connect(str(db_path), timeout=30, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results "
+                "(key TEXT PRIMARY KEY, version TEXT NOT NULL, value BLOB NOT NULL, created REAL NOT NULL DEFAULT 0)"
+            )
+            columns = {row[1] for row in self._db.execute("PRAGMA table_info(results)")}
+            if "created" not in columns:
+                try:
+                    self._db.execute("ALTER TABLE results ADD COLUMN created REAL NOT NULL DEFAULT 0")
+                except sqlite3.OperationalError:
+                    # another process migrated the table first
+                    pass
+            self._db.execute("CREATE INDEX IF NOT EXISTS results_created ON results (created)")
+            self._db.commit()
+
+    def _check_version(self, version):
+        if version == self._version:
+            return
+
+        if self._version is not None:
+            self.stats["invalidations"] += len(self._entries)
+            self._entries.clear()
+            self._size = 0
+
+        # the database is shared with processes that may still be on another version;
+        # keys carry the version, so their rows are only dropped once nobody has
+        # written them for a while
+        if self._db is not None:
+            self._collect(version)
+
+        self._version = version
+
+    def _collect(self, version):
+        self._db.execute(
+            "DELETE FROM results WHERE version != ? AND created < ?", (version, time.time() - self.stale_age)
+        )
+
+        rows, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM results").fetchone()
+        if size > self.db_max_bytes:
+            # oldest first, down to 90% of the limit so that this does not run on every put
+            excess = size - self.db_max_bytes * 0.9
+            self._db.execute(
+                "DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY created LIMIT ?)",
+                (int(rows * excess / size) + 1,),
+            )
+        self._db.commit()
+
+    def _remember(self, key, blob):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._size -= len(old)
+
+        if len(blob) > self.max_bytes:
+            return
+
+        self._entries[key] = blob
+        self._size += len(blob)
+
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+            self.stats["evictions"] += 1
+            count("cache_evictions", cache="result")
+
+    def get(self, key, version, layouts):
+        # entries never outlive their ontology version, so they are stored without
+        # role layouts and decoded against the caller's
+        with self._lock:
+            self._check_version(version)
+
+            blob = self._entries.get(key)
+            if blob is not None:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                count("cache_hits", cache="result_memory")
+                return decode_results(blob, layouts)
+
+            if self._db is not None:
+                row = self._db.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+                # rows pickled by older versions of the cache are simply recomputed
+                if row is not None and row[0].startswith(RESULTS_MAGIC):
+                    self._remember(key, row[0])
+                    self.stats["disk_hits"] += 1
+                    count("cache_hits", cache="result_disk")
+                    return decode_results(row[0], layouts)
+
+            self.stats["misses"] += 1
+            count("cache_misses", cache="result")
+            return None
+
+    def put(self, key, version, value):
+        blob = encode_results(value, layouts=False)
+
+        with self._lock:
+            self._check_version(version)
+            self._remember(key, blob)
+
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO results (key, version, value, created) VALUES (?, ?, ?, ?)",
+                    (key, version, blob, time.time()),
+                )
+                self._db.commit()
+
+                self._puts += 1
+                if self._puts % GC_EVERY == 0:
+                    self._collect(version)
+
+    def evaluate(self, cleaned_resume, raw_resume, jd_texts):
+        ontology = get_ontology()
+        key = cache_key(resume_fingerprint(cleaned_resume, raw_resume), ontology.version, list(jd_texts))
+
+        results = self.get(key, ontology.version, get_role_layouts(ontology))
+        if results is None:
+            results = evaluate_multiple_roles(cleaned_resume, raw_resume, jd_texts, ontology)
+            self.put(key, ontology.version, results)
+        return results
+
+    def memory_bytes(self):
+        return self._size
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+_DEFAULT_CACHE = None
+_DEFAULT_LOCK = threading.Lock()
+
+
+def get_result_cache():
+    global _DEFAULT_CACHE
+    with _DEFAULT_LOCK:
+        if _DEFAULT_CACHE is None:
+            _DEFAULT_CACHE = ResultCache()
+        return _DEFAULT_CACHE
+
+
+def evaluate_cached(cleaned_resume, raw_resume, jd_texts):
+    return get_result_cache().evaluate(cleaned_resume, raw_resume, jd_texts)
@@ -1,45 +1,22 @@
-import json
-import re
-from pathlib import Path
+import warnings
 
-BASE_DIR = Path(__file__).resolve().parent.parent
-LEARNED_PATH = BASE_DIR / "data" / "learned_roles.json"
+from pipeline.ontology import get_learned_log
+from pipeline.instrumentation import timed
+from pipeline.phrase_stats import get_phrase_index, rank_phrases
 
 
-def normalize(text):
-    text = text.lower()
-    text = re.sub(r'[^a-z0-9 ]', ' ', text)
-    return text
-STOPWORDS = {
-    "with","and","the","for","from","that","this","will","have","has","are","was",
-    "were","but","not","you","your","our","their","they","them","such","able",
-    "seeking","looking","responsible","knowledgeable","dedicated","strong","excellent",
-    "good","high","new","all","any","other","more","less","very","use","using",
-    "experience","skills","work","working","team","role","job","position"
-}
-
 def extract_candidate_skills(jd_text):
-    text = normalize(jd_text)
-
-    phrases = re.findall(r'\b[a-z]{3,}(?:\s[a-z]{3,}){0,2}\b', text)
-
-    clean = []
-    for p in phrases:
-        words = p.split()
-        if any(w in STOPWORDS for w in words):
-            continue
-        if len(words) == 1 and len(words[0]) < 5:
-            continue
-        clean.append(p)
-
-    unique = list(dict.fromkeys(clean))
-    return unique[:20]
-
+    # phrases common to the whole JD corpus ("communication skills") rank below
+    # the ones that set this JD apart; without an index this is plain term frequency
+    return rank_phrases(jd_text, get_phrase_index(), limit=20)
 
 
-def build_new_role(role_name, jd_text, skills_file="data/skills.json"):
-    with open(skills_file, encoding="utf-8") as f:
-        config = json.load(f)
+@timed("build_new_role")
+def build_new_role(role_name, jd_text, skills_file=None):
+    if skills_file is not None:
+        # roles go to the learned-roles log of the configured ontology now
+        warnings.warn("build_new_role() ignores skills_file; use configure_ontology() to pick the ontology",
+                      DeprecationWarning, stacklevel=3)
 
     extracted = extract_candidate_skills(jd_text)
 
@@ -49,27 +26,12 @@ def build_new_role(role_name, jd_text, skills_file="data/skills.json"):
         "tools": extracted[14:20]
     }
 
-    config["skills_dictionary"][role_name] = new_role_definition
-    config["role_keywords"][role_name] = extracted[:6]
-
-    with open(skills_file, "w", encoding="utf-8") as f:
-        json.dump(config, f, indent=2)
-
-    save_learned_role(role_name, config["skills_dictionary"][role_name])
+    save_learned_role(role_name, new_role_definition)
 
     return extracted
 
 
 def save_learned_role(role_name, role_data):
-    LEARNED_PATH.parent.mkdir(exist_ok=True)
-
-    if LEARNED_PATH.exists():
-        with open(LEARNED_PATH, "r", encoding="utf-8") as f:
-            learned = json.load(f)
-    else:
-        learned = {}
-
-    learned[role_name] = role_data
-
-    with open(LEARNED_PATH, "w", encoding="utf-8") as f:
-        json.dump(learned, f, indent=4)
+    log = get_learned_log()
+    size = log.append(role_name, role_data)
+    log.maybe_compact(size)
@@ -0,0 +1,151 @@
+import heapq
+import re
+from collections import defaultdict
+
+from pipeline.instrumentation import timed
+from pipeline.normalizer import AliasTable
+from pipeline.ontology import get_ontology
+from pipeline.role_inference import KNOWN_BASE_ROLES, TITLE_WORDS
+from pipeline.skill_matcher import SkillMatcher
+
+MIN_KEYWORD_HITS = 2
+TOP_K = 5
+
+_WORD_TABLE = bytes(c if c in b"abcdefghijklmnopqrstuvwxyz0123456789\n" else 32 for c in range(256))
+_SPACES = re.compile(r' *\n[ \n]*| {2,}')
+
+
+def normalize(text):
+    # line breaks survive, one per run of blank space, for title detection
+    text = text.lower().encode("ascii", "replace").translate(_WORD_TABLE).decode("ascii")
+    return _SPACES.sub(lambda m: "\n" if "\n" in m.group() else " ", text)
+
+
+def _phrase(text, alias_table):
+    phrase = " ".join(text.lower().split())
+    # keywords such as "c++" can never occur in normalized text
+    if not phrase or normalize(phrase) != phrase:
+        return None
+    # rewritten like the JD text will be, so "k8s" and "kubernetes" find the same keyword
+    return alias_table.rewrite(phrase)
+
+
+def _plurals(phrase):
+    # job titles are often plural ("teachers", "ml engineers", "data analysts")
+    return (phrase, phrase + "s", phrase + "es")
+
+
+class RoleClassifier:
+    def __init__(self, ontology):
+        self.roles = list(ontology.role_keywords)
+        for role in ontology.learned_roles:
+            if role not in self.roles:
+                self.roles.append(role)
+        self.role_order = {role: i for i, role in enumerate(self.roles)}
+        self.alias_table = AliasTable(ontology.skill_aliases, normalize)
+
+        self.names = defaultdict(list)
+        self.keywords = defaultdict(list)
+        self.aliases = {}
+
+        for role in ontology.learned_roles:
+            phrase = _phrase(role, self.alias_table)
+            if phrase:
+                for form in _plurals(phrase):
+                    self.names[form].append(role)
+
+        for role, keywords in ontology.role_keywords.items():
+            for keyword in dict.fromkeys(keywords):
+                phrase = _phrase(keyword, self.alias_table)
+                if phrase:
+                    self.keywords[phrase].append(role)
+
+        for rank, (canonical, aliases) in enumerate(KNOWN_BASE_ROLES.items()):
+            for alias in aliases:
+                phrase = _phrase(alias, self.alias_table)
+                if phrase:
+                    for form in _plurals(phrase):
+                        if form not in self.aliases:
+                            self.aliases[form] = (rank, canonical)
+
+        self.title_words = {_phrase(w, self.alias_table) for w in TITLE_WORDS}
+        # names and aliases must start and end a token, plurals included ("md" is not in
+        # "cardmd", "teachers" is a teacher); keywords only need to start a word
+        # ("pipelines", "students") and title words may end one ("mlengineer")
+        self.matcher = SkillMatcher(set(self.names) | set(self.aliases), set(self.keywords) | self.title_words)
+
+    def _title(self, text, title_spans):
+        starts = sorted(start for spans in title_spans for start, _ in spans)
+        checked = set()
+
+        for start in starts:
+            line_start = text.rfind("\n", 0, start) + 1
+            if line_start in checked:
+                continue
+            checked.add(line_start)
+
+            line_end = text.find("\n", start)
+            words = text[line_start:line_end if line_end != -1 else len(text)].split()
+            if 2 <= len(words) <= 4:
+                return "".join(words)
+
+        return None
+
+    def classify(self, jd_text, top_k=TOP_K):
+        lines = normalize(jd_text)
+        # keywords, names and aliases are matched across line breaks ("machine\nlearning"
+        # is a JD wrapped mid-phrase); only title detection looks at the lines
+        text = self.alias_table.rewrite(lines.replace("\n", " "))
+        hits = self.matcher.scan(text)
+
+        named = set()
+        matched = defaultdict(list)
+        best_alias = None
+
+        for phrase, spans in hits.triggers.items():
+            if phrase in self.keywords and any(start == 0 or text[start - 1] == " " for start, _ in spans):
+                for role in self.keywords[phrase]:
+                    matched[role].append(phrase)
+
+        for phrase, spans in hits.skills.items():
+            for role in self.names.get(phrase, ()):
+                named.add(role)
+            alias = self.aliases.get(phrase)
+            if alias is not None and (best_alias is None or alias < best_alias):
+                best_alias = alias
+
+        candidates = heapq.nsmallest(
+            top_k,
+            named | set(matched),
+            key=lambda role: (role not in named, -len(matched[role]), self.role_order[role]),
+        )
+
+        ranked = [
+            {"role": role, "score": len(matched[role]), "name_match": role in named,
+             "keywords": sorted(matched[role])}
+            for role in candidates
+        ]
+
+        role = None
+        if ranked and (ranked[0]["name_match"] or ranked[0]["score"] >= MIN_KEYWORD_HITS):
+            role = ranked[0]["role"]
+
+        if best_alias is not None:
+            inferred = best_alias[1]
+        else:
+            lines = self.alias_table.rewrite(lines)
+            title_spans = [spans for phrase, spans in self.matcher.scan(lines).triggers.items()
+                           if phrase in self.title_words]
+            inferred = self._title(lines, title_spans) or "customrole"
+
+        return {"role": role, "inferred_role": inferred, "candidates": ranked}
+
+
+def get_role_classifier(ontology=None):
+    ontology = ontology or get_ontology()
+    return ontology.derived("role_classifier", RoleClassifier)
+
+
+@timed("classify_role")
+def classify_role(jd_text, top_k=TOP_K, ontology=None):
+    return get_role_classifier(ontology).classify(jd_text, top_k)
@@ -0,0 +1,108 @@
+import heapq
+from collections import defaultdict
+
+from pipeline.skill_graph import SkillGraph
+
+TIERS = ["core", "preferred", "tools"]
+TIER_WEIGHTS = {"core": 3, "preferred": 1.5, "tools": 1}
+SQL_VARIANTS = ("postgresql", "mysql")
+
+
+class RoleIndex:
+    def __init__(self, skills_dictionary, role_aliases=None, skill_aliases=None, skill_graph=None):
+        role_aliases = role_aliases or {}
+        skill_aliases = skill_aliases or {}
+        self.skill_graph = skill_graph or SkillGraph({})
+
+        self.roles = list(skills_dictionary)
+        self.role_ids = {role: i for i, role in enumerate(self.roles)}
+        self.target_sizes = []
+        self.postings = defaultdict(list)
+
+        slot = 0
+        for role_id, role in enumerate(self.roles):
+            source = skills_dictionary[role_aliases.get(role, role)]
+            source_norm = {
+                tier: {skill_aliases.get(s, s) for s in source[tier]}
+                for tier in TIERS
+            }
+
+            sizes = []
+            for tier_id, tier in enumerate(TIERS):
+                targets = set(skills_dictionary[role][tier])
+                sizes.append(len(targets))
+
+                for skill in targets:
+                    keys = set()
+                    if skill in source_norm[tier]:
+                        keys.add(("hit", skill))
+                        if tier != "tools" and skill in self.skill_graph.evidence:
+                            keys.add(("derived", skill))
+
+                    if tier == "core" and skill == "sql":
+                        for t in TIERS:
+                            for variant in SQL_VARIANTS:
+                                if variant in source_norm[t]:
+                                    keys.add(("hit", variant))
+
+                    for key in keys:
+                        self.postings[key].append((slot, role_id, tier_id))
+                    slot += 1
+
+            self.target_sizes.append(sizes)
+
+    def resume_keys(self, *hit_sets):
+        keys = set()
+        for hits in hit_sets:
+            keys.update(("hit", skill) for skill in hits.skills)
+            keys.update(("derived", skill) for skill in self.skill_graph.implied(hits))
+        return keys
+
+    def match_counts(self, keys):
+        seen = set()
+        counts = {}
+
+        for key in keys:
+            for slot, role_id, tier_id in self.postings.get(key, ()):
+                if slot in seen:
+                    continue
+                seen.add(slot)
+
+                role_counts = counts.get(role_id)
+                if role_counts is None:
+                    role_counts = counts[role_id] = [0, 0, 0]
+                role_counts[tier_id] += 1
+
+        return counts
+
+    def score(self, role_id, matched_counts):
+        total = 0
+        possible = 0
+
+        for tier_id, tier in enumerate(TIERS):
+            w = TIER_WEIGHTS[tier]
+            matched = matched_counts[tier_id]
+            missing = self.target_sizes[role_id][tier_id] - matched
+
+            total += matched * w
+            possible += (matched + missing) * w
+
+        return round((total / possible) * 100, 2) if possible else 0
+
+    def rank(self, keys, roles=None, top_k=None):
+        counts = self.match_counts(keys)
+
+        if roles is None:
+            candidates = sorted(counts)
+        else:
+            candidates = [self.role_ids[role] for role in roles]
+
+        scored = [
+            (self.roles[role_id], self.score(role_id, counts[role_id]))
+            for role_id in candidates
+            if role_id in counts and counts[role_id][0] > 0
+        ]
+
+        if top_k is None:
+            return sorted(scored, key=lambda x: x[1], reverse=True)
+        return heapq.nlargest(top_k, scored, key=lambda x: x[1])
@@ -1,5 +1,3 @@
-import re
-
 KNOWN_BASE_ROLES = {
     "teacher": ["teacher", "educator", "instructor", "professor", "tutor"],
     "datascientist": ["data scientist", "data science"],
@@ -13,18 +11,9 @@ KNOWN_BASE_ROLES = {
     "doctor": ["doctor", "physician", "mbbs", "md"]
 }
 
-def infer_role_name(jd_text):
-    text = jd_text.lower()
-
-    for canonical, aliases in KNOWN_BASE_ROLES.items():
-        for alias in aliases:
-            if alias in text:
-                return canonical
+TITLE_WORDS = ["engineer", "manager", "teacher", "analyst", "developer", "nurse", "doctor"]
 
-    for line in jd_text.splitlines():
-        clean = line.lower().strip()
-        if 2 <= len(clean.split()) <= 4:
-            if any(word in clean for word in ["engineer", "manager", "teacher", "analyst", "developer", "nurse", "doctor"]):
-                return clean.replace(" ", "")
+def infer_role_name(jd_text):
+    from pipeline.role_classifier import classify_role
 
-    return "customrole"
+    return classify_role(jd_text)["inferred_role"]
@@ -0,0 +1,230 @@
+import json
+import struct
+from array import array
+from collections.abc import Mapping
+
+TIERS = ("core", "preferred", "tools")
+RESULT_KEYS = ("role", "score", "verdict", "report")
+NO_SUITABLE_ROLE = "NO SUITABLE ROLE FOUND"
+
+RESULTS_MAGIC = b"roleres1"
+NO_LAYOUT = 0xFFFF
+LAYOUT_CACHE = 4096
+
+_COUNT = struct.Struct("<I")
+_RECORD = struct.Struct("<HdHH")
+
+
+class RoleLayout:
+    # the skill vocabulary of one role, one slot per name: each tier holds its target
+    # skills first, then the resume skills of that tier that only ever count as extra
+    __slots__ = ("role", "names", "tiers", "sources", "sql_slot")
+
+    def __init__(self, role, names, tiers, sources, sql_slot):
+        self.role = role
+        self.names = tuple(names)
+        self.tiers = tuple(tuple(t) for t in tiers)
+        self.sources = tuple(tuple(s) for s in sources)
+        self.sql_slot = sql_slot
+
+    @classmethod
+    def build(cls, role, targets, sources):
+        names, tiers, source_slots = [], [], []
+        sql_slot = None
+
+        for tier in TIERS:
+            start = len(names)
+            slots = {}
+            for skill in targets[tier]:
+                if skill not in slots:
+                    slots[skill] = len(names)
+                    names.append(skill)
+            target_end = len(names)
+
+            for skill in list(sources[tier]) + (["sql"] if tier == "core" else []):
+                if skill not in slots:
+                    slots[skill] = len(names)
+                    names.append(skill)
+
+            if tier == "core":
+                sql_slot = slots["sql"]
+            tiers.append((start, target_end, len(names)))
+            # kept in definition order, duplicates included: each occurrence counts
+            source_slots.append([slots[skill] for skill in sources[tier]])
+
+        return cls(role, names, tiers, source_slots, sql_slot)
+
+    def _key(self):
+        return (self.role, self.names, self.tiers, self.sources, self.sql_slot)
+
+    def __reduce__(self):
+        return (_layout, self._key())
+
+
+_LAYOUTS = {}
+
+
+def _layout(role, names, tiers, sources, sql_slot):
+    # results decoded from storage share one layout per role definition
+    layout = RoleLayout(role, names, tiers, sources, sql_slot)
+    key = layout._key()
+    shared = _LAYOUTS.get(key)
+    if shared is None:
+        if len(_LAYOUTS) >= LAYOUT_CACHE:
+            _LAYOUTS.clear()
+        shared = _LAYOUTS[key] = layout
+    return shared
+
+
+def _number(value):
+    return int(value) if value.is_integer() else value
+
+
+class RoleResult(Mapping):
+    # reads like the {"role", "score", "verdict", "report"} dict it replaces; the
+    # report is only materialized when somebody asks for it
+    __slots__ = ("role", "score", "verdict", "layout", "counts")
+
+    def __init__(self, role, score, verdict, layout, counts):
+        self.role = role
+        self.score = score
+        self.verdict = verdict
+        self.layout = layout
+        self.counts = counts if isinstance(counts, array) else array("d", counts)
+
+    def __getitem__(self, key):
+        if key == "report":
+            return self.report()
+        if key in ("role", "score", "verdict"):
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key not in ("score", "verdict"):
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __iter__(self):
+        return iter(RESULT_KEYS)
+
+    def __len__(self):
+        return len(RESULT_KEYS)
+
+    def __repr__(self):
+        return f"RoleResult({dict(self)!r})"
+
+    def __reduce__(self):
+        # pickled for result caches and worker processes in the same compact form
+        return (_decode_one, (encode_results([self]),))
+
+    def matched_counts(self):
+        counts = self.counts
+        return [sum(1 for i in range(start, target_end) if counts[i]) for start, target_end, _ in self.layout.tiers]
+
+    def report(self):
+        names, counts = self.layout.names, self.counts
+        report = {}
+        for tier, (start, target_end, end) in zip(TIERS, self.layout.tiers):
+            report[tier] = {
+                "matched": {names[i]: _number(counts[i]) for i in range(start, target_end) if counts[i]},
+                "missing": [names[i] for i in range(start, target_end) if not counts[i]],
+                "extra": [names[i] for i in range(target_end, end) if counts[i]],
+            }
+        return report
+
+
+def no_suitable_role():
+    return {
+        "role": "none",
+        "score": 0.0,
+        "verdict": NO_SUITABLE_ROLE,
+        "report": {
+            "core": {"matched": None, "missing": None, "extra": None},
+            "preferred": {"matched": None, "missing": None, "extra": None},
+            "tools": {"matched": None, "missing": None, "extra": None}
+        }
+    }
+
+
+def json_default(obj):
+    # for json.dumps(..., default=json_default) wherever results leave the process as JSON
+    if isinstance(obj, RoleResult):
+        return dict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def encode_results(results, layouts=True):
+    # header: the roles, verdicts and (unless the reader has them from its own
+    # ontology) layouts used, as JSON; then per result the role and verdict numbers,
+    # the score and only the non-zero slots
+    roles, verdicts = {}, {}
+    records = []
+
+    for result in results:
+        verdict = verdicts.setdefault(result["verdict"], len(verdicts))
+        if isinstance(result, RoleResult):
+            role = roles.setdefault(result.role, (len(roles), result.layout))[0]
+            slots = array("H", (i for i, c in enumerate(result.counts) if c))
+            values = array("d", (result.counts[i] for i in slots))
+        else:
+            role, slots, values = NO_LAYOUT, array("H"), array("d")
+
+        records.append(_RECORD.pack(role, result["score"], verdict, len(slots)))
+        records.append(slots.tobytes())
+        records.append(values.tobytes())
+
+    header = {"roles": list(roles), "verdicts": list(verdicts)}
+    if layouts:
+        header["layouts"] = [[layout.names, layout.tiers] for _, layout in roles.values()]
+    header = json.dumps(header).encode("utf-8")
+
+    return b"".join([RESULTS_MAGIC, _COUNT.pack(len(header)), header, _COUNT.pack(len(results))] + records)
+
+
+def decode_results(blob, layouts=None):
+    blob = memoryview(blob)
+    if bytes(blob[:len(RESULTS_MAGIC)]) != RESULTS_MAGIC:
+        raise ValueError("not an encoded result list")
+
+    pos = len(RESULTS_MAGIC)
+    (size,) = _COUNT.unpack_from(blob, pos)
+    pos += _COUNT.size
+    header = json.loads(bytes(blob[pos:pos + size]))
+    pos += size
+    (n,) = _COUNT.unpack_from(blob, pos)
+    pos += _COUNT.size
+
+    if layouts is not None:
+        role_layouts = [layouts[role] for role in header["roles"]]
+    else:
+        # enough to report on, not to score with
+        role_layouts = [_layout(role, names, tiers, (), None)
+                        for role, (names, tiers) in zip(header["roles"], header["layouts"])]
+    verdicts = header["verdicts"]
+
+    results = []
+    for _ in range(n):
+        role_id, score, verdict, nnz = _RECORD.unpack_from(blob, pos)
+        pos += _RECORD.size
+        slots, values = array("H"), array("d")
+        slots.frombytes(blob[pos:pos + 2 * nnz])
+        pos += 2 * nnz
+        values.frombytes(blob[pos:pos + 8 * nnz])
+        pos += 8 * nnz
+
+        if role_id == NO_LAYOUT:
+            result = no_suitable_role()
+            result["score"], result["verdict"] = score, verdicts[verdict]
+        else:
+            layout = role_layouts[role_id]
+            counts = array("d", bytes(8 * len(layout.names)))
+            for slot, value in zip(slots, values):
+                counts[slot] = value
+            result = RoleResult(layout.role, score, verdicts[verdict], layout, counts)
+        results.append(result)
+
+    return results
+
+
+def _decode_one(blob):
+    return decode_results(blob)[0]
@@ -0,0 +1,235 @@
+import argparse
+import json
+import sys
+
+import numpy as np
+
+from pipeline.ontology import get_ontology
+from pipeline.role_index import TIERS, TIER_WEIGHTS
+from pipeline.skill_engine import get_role_index, prepare_resume_hits
+
+CHUNK_CELLS = 8 * 1024 * 1024
+INELIGIBLE = -1
+
+
+def _ranges(starts, lengths):
+    # concatenation of arange(s, s + n) for every (s, n), without a Python loop
+    total = int(lengths.sum())
+    if total == 0:
+        return np.zeros(0, dtype=np.int64)
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return offsets + np.arange(total)
+
+
+def to_centi(raw):
+    scaled = raw * 100
+    centi = np.rint(scaled)
+
+    # rint of the scaled value can land on the wrong side of a tie;
+    # redo anything near a half with Python's correctly rounded round()
+    close = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    for idx in zip(*np.nonzero(close)):
+        centi[idx] = round(round(float(raw[idx]), 2) * 100)
+
+    return centi.astype(np.int32)
+
+
+def _top_n(centi, n, axis):
+    # composite key: score first, then earlier position wins ties, like a stable sort
+    size = centi.shape[axis]
+    position = np.arange(size - 1, -1, -1, dtype=np.int64)
+    position = position[:, None] if axis == 0 else position[None, :]
+    keys = centi.astype(np.int64) * size + position
+
+    n = min(n, size)
+    if n < size:
+        part = np.argpartition(-keys, n - 1, axis=axis)
+        part = part[:n] if axis == 0 else part[:, :n]
+    else:
+        part = np.broadcast_to(np.arange(size)[:, None] if axis == 0 else np.arange(size)[None, :], keys.shape)
+
+    picked = np.take_along_axis(keys, part, axis=axis)
+    order = np.argsort(-picked, axis=axis)
+    return np.take_along_axis(part, order, axis=axis)
+
+
+class ScoreMatrix:
+    def __init__(self, index):
+        self.index = index
+        self.roles = index.roles
+        self.role_ids = index.role_ids
+        self.vocabulary = {key: i for i, key in enumerate(index.postings)}
+
+        # only slots some key can reach are stored; unreachable ones just count as missing
+        slots = {}
+        for postings in index.postings.values():
+            for slot, role_id, tier_id in postings:
+                slots.setdefault(slot, (role_id, tier_id))
+        slot_ids = {slot: i for i, slot in enumerate(sorted(slots))}
+
+        n_roles = len(self.roles)
+        self.n_slots = len(slot_ids)
+        self.slot_cell = np.zeros(self.n_slots, dtype=np.int64)
+        for slot, (role_id, tier_id) in slots.items():
+            self.slot_cell[slot_ids[slot]] = tier_id * n_roles + role_id
+
+        self.key_ptr = np.zeros(len(self.vocabulary) + 1, dtype=np.int64)
+        key_slots = []
+        for key, i in self.vocabulary.items():
+            targets = [slot_ids[slot] for slot, _, _ in index.postings[key]]
+            key_slots.extend(targets)
+            self.key_ptr[i + 1] = self.key_ptr[i] + len(targets)
+        self.key_slots = np.array(key_slots, dtype=np.int64)
+
+        sizes = np.array(index.target_sizes, dtype=np.int64).reshape(n_roles, len(TIERS))
+        self.possible = np.zeros(n_roles, dtype=np.int64)
+        for tier_id, tier in enumerate(TIERS):
+            self.possible += sizes[:, tier_id] * int(TIER_WEIGHTS[tier] * 2)
+
+    def vectorize(self, keys):
+        return np.array(sorted(self.vocabulary[k] for k in keys if k in self.vocabulary), dtype=np.int64)
+
+    def tier_counts(self, vectors):
+        n_cells = len(TIERS) * len(self.roles)
+
+        rows = np.repeat(np.arange(len(vectors)), [len(v) for v in vectors])
+        keys = np.concatenate(vectors) if vectors else np.zeros(0, dtype=np.int64)
+        lengths = self.key_ptr[keys + 1] - self.key_ptr[keys]
+
+        slots = self.key_slots[_ranges(self.key_ptr[keys], lengths)]
+        # a slot reached through several keys (sql variants, derived skills) counts once
+        reached = np.zeros(len(vectors) * self.n_slots, dtype=bool)
+        reached[np.repeat(rows, lengths) * self.n_slots + slots] = True
+        pairs = np.flatnonzero(reached)
+
+        cells = (pairs // self.n_slots) * n_cells + self.slot_cell[pairs % self.n_slots]
+        counts = np.bincount(cells, minlength=len(vectors) * n_cells)
+        return counts.reshape(len(vectors), len(TIERS), len(self.roles))
+
+    def centi_scores(self, vectors, roles=None):
+        columns = None if roles is None else np.array([self.role_ids[r] for r in roles], dtype=np.int64)
+        n_cols = len(self.roles) if columns is None else len(columns)
+        centi = np.empty((len(vectors), n_cols), dtype=np.int32)
+
+        step = max(1, CHUNK_CELLS // max(len(TIERS) * len(self.roles), self.n_slots))
+        for start in range(0, len(vectors), step):
+            counts = self.tier_counts(vectors[start:start + step])
+            possible = self.possible
+            if columns is not None:
+                counts = counts[:, :, columns]
+                possible = possible[columns]
+
+            # tier weights are multiples of 0.5, so doubled totals are exact integers and
+            # total / possible rounds exactly like compute_weighted_score's float division
+            total = np.zeros((counts.shape[0], counts.shape[2]), dtype=np.int64)
+            for tier_id, tier in enumerate(TIERS):
+                total += counts[:, tier_id] * int(TIER_WEIGHTS[tier] * 2)
+
+            with np.errstate(divide="ignore", invalid="ignore"):
+                raw = np.where(possible > 0, total / possible * 100, 0.0)
+
+            chunk = to_centi(raw)
+            chunk[counts[:, 0] == 0] = INELIGIBLE
+            centi[start:start + step] = chunk
+
+        return centi
+
+    def scores(self, vectors, roles=None):
+        roles = list(self.roles) if roles is None else list(roles)
+        return ScoreResult(roles, self.centi_scores(vectors, roles))
+
+
+class ScoreResult:
+    def __init__(self, roles, centi):
+        self.roles = roles
+        self.role_ids = {role: i for i, role in enumerate(roles)}
+        self.centi = centi
+
+    @property
+    def scores(self):
+        return np.where(self.centi >= 0, self.centi / 100, np.nan)
+
+    def score(self, resume, role):
+        value = int(self.centi[resume, self.role_ids[role]])
+        return None if value < 0 else value / 100
+
+    def top_candidates(self, role, n=10):
+        column = self.centi[:, self.role_ids[role]][:, None]
+        order = _top_n(column, n, axis=0)[:, 0]
+        return [(int(i), int(column[i, 0]) / 100) for i in order if column[i, 0] >= 0]
+
+    def top_roles(self, resume, n=5):
+        row = self.centi[resume][None, :]
+        order = _top_n(row, n, axis=1)[0]
+        return [(self.roles[i], int(row[0, i]) / 100) for i in order if row[0, i] >= 0]
+
+    def top_candidates_per_role(self, n=10, block=1024):
+        top = {}
+        for start in range(0, len(self.roles), block):
+            centi = self.centi[:, start:start + block]
+            order = _top_n(centi, n, axis=0)
+            picked = np.take_along_axis(centi, order, axis=0)
+            for col in range(centi.shape[1]):
+                top[self.roles[start + col]] = [
+                    (int(i), int(v) / 100) for i, v in zip(order[:, col], picked[:, col]) if v >= 0
+                ]
+        return top
+
+    def top_roles_per_candidate(self, n=5, block=1024):
+        top = []
+        for start in range(0, len(self.centi), block):
+            centi = self.centi[start:start + block]
+            order = _top_n(centi, n, axis=1)
+            picked = np.take_along_axis(centi, order, axis=1)
+            for row in range(centi.shape[0]):
+                top.append([(self.roles[c], int(v) / 100) for c, v in zip(order[row], picked[row]) if v >= 0])
+        return top
+
+
+def get_score_matrix(ontology=None):
+    ontology = ontology or get_ontology()
+    return ontology.derived("score_matrix", lambda o: ScoreMatrix(get_role_index(o)))
+
+
+def resume_keys(cleaned_resume, raw_resume, ontology=None):
+    ontology = ontology or get_ontology()
+    index = get_role_index(ontology)
+    return index.resume_keys(*prepare_resume_hits(cleaned_resume, raw_resume, ontology))
+
+
+def score_resumes(resumes, roles=None, ontology=None):
+    ontology = ontology or get_ontology()
+    matrix = get_score_matrix(ontology)
+    vectors = [matrix.vectorize(resume_keys(cleaned, raw, ontology)) for cleaned, raw in resumes]
+    return matrix.scores(vectors, roles)
+
+
+def main(argv=None):
+    from pipeline.batch import collect_inputs
+    from pipeline.full_resume_extractor import extract_text
+    from pipeline.text_cleaner import clean_text
+
+    parser = argparse.ArgumentParser(description="Rank many resumes against one or more roles.")
+    parser.add_argument("source", help="directory of PDFs or manifest file (one path or JSON object per line)")
+    parser.add_argument("--roles", nargs="+", help="roles to rank for (default: every role in the ontology)")
+    parser.add_argument("--top", type=int, default=10, help="candidates to keep per role")
+    args = parser.parse_args(argv)
+
+    paths = []
+    resumes = []
+    for path in collect_inputs(args.source):
+        try:
+            raw_text = extract_text(path)
+        except Exception as e:
+            print(f"skipping {path}: {type(e).__name__}: {e}", file=sys.stderr)
+            continue
+        paths.append(path)
+        resumes.append((clean_text(raw_text), raw_text))
+
+    result = score_resumes(resumes, args.roles)
+    for role, candidates in result.top_candidates_per_role(args.top).items():
+        print(json.dumps({"role": role, "candidates": [{"path": paths[i], "score": s} for i, s in candidates]}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+from pipeline.normalizer import normalize_tokens, repair_broken_spacing
+
+SECTION_HEADINGS = {
+    "summary": ("summary", "professional summary", "career summary", "profile", "objective", "career objective",
+                "about me"),
+    "experience": ("experience", "work experience", "professional experience", "employment", "employment history",
+                   "work history", "internships"),
+    "projects": ("projects", "project experience", "academic projects", "personal projects", "key projects"),
+    "skills": ("skills", "technical skills", "key skills", "core skills", "skills and tools"),
+    "education": ("education", "academic background", "educational qualifications"),
+    "certifications": ("certifications", "certificates", "licenses and certifications"),
+}
+
+_BY_HEADING = {heading.replace(" ", ""): section
+               for section, headings in SECTION_HEADINGS.items() for heading in headings}
+
+# longer lines are body text and never looked up
+HEADING_CHARS = 48
+
+
+def segment_sections(text):
+    # (section, start, end) offsets into text, one pass over its lines; a section runs
+    # from the end of its heading line to the start of the next heading. Headings are
+    # looked up with their spaces taken out, as repair_broken_spacing may have glued
+    # the words together ("W O R K  E X P E R I E N C E")
+    spans = []
+    section = start = None
+    pos = 0
+
+    for line in text.split("\n"):
+        end = pos + len(line)
+        heading = None
+        if len(line) <= HEADING_CHARS:
+            heading = _BY_HEADING.get("".join(line.lower().split()).rstrip(":"))
+
+        if heading is not None:
+            if section is not None:
+                spans.append((section, start, pos))
+            section = heading
+            start = end
+        pos = end + 1
+
+    if section is not None:
+        spans.append((section, start, len(text)))
+    return spans
+
+
+class SectionedDocument:
+    # normalized like NormalizedDocument, but piece by piece between section
+    # boundaries so that the spans carry over into the normalized text. Headings
+    # are whole words on lines of their own, which no normalization rule reaches
+    # across, so the text is the same as NormalizedDocument(text).text. A rewrite
+    # (the alias table) is applied piece by piece for the same reason
+    __slots__ = ("text", "sections")
+
+    def __init__(self, text, rewrite=None):
+        repaired = repair_broken_spacing(text)
+        pieces = []
+        width = 0
+        pos = 0
+        self.sections = []
+
+        for section, start, end in segment_sections(repaired) + [(None, len(repaired), len(repaired))]:
+            for name, piece_start, piece_end in ((None, pos, start), (section, start, end)):
+                piece = " ".join(normalize_tokens(repaired[piece_start:piece_end]))
+                if rewrite is not None:
+                    piece = rewrite(piece)
+                if not piece:
+                    continue
+
+                if name is not None:
+                    self.sections.append((name, width, width + len(piece)))
+                pieces.append(piece)
+                width += len(piece) + 1
+            pos = end
+
+        self.text = " ".join(pieces)
+
+    def spans(self, section):
+        return [(start, end) for name, start, end in self.sections if name == section]
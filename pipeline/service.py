@@ -0,0 +1,330 @@
+import argparse
+import base64
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from pipeline.full_resume_extractor import ExtractionPool, PdfBudgetExceeded, PdfTimedOut, extract_text
+from pipeline.instrumentation import METRICS, count, span
+from pipeline.ontology import get_ontology
+from pipeline.result_cache import evaluate_cached
+from pipeline.role_builder import build_new_role
+from pipeline.role_classifier import classify_role, get_role_classifier
+from pipeline.role_result import json_default
+from pipeline.skill_engine import get_role_index, get_skill_matcher, rank_roles
+from pipeline.text_cleaner import clean_text
+
+DEFAULT_ROLES = ["mlengineer", "datascientist", "webdeveloper", "softwaredeveloper"]
+MAX_BODY_BYTES = 25 * 1024 * 1024
+MAX_BATCH = 64
+PDF_TIMEOUT = 60.0
+
+
+class ServiceError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+_KINDS = {str: "a string", int: "an integer", bool: "a boolean", list: "a list", dict: "an object"}
+
+
+def _field(payload, name, kind, default=None):
+    value = payload.get(name)
+    if value is None:
+        return default
+    # bool is an int subclass, but "top_k": true is not a count
+    if not isinstance(value, kind) or (kind is int and isinstance(value, bool)):
+        raise ServiceError(400, f"{name} must be {_KINDS[kind]}")
+    return value
+
+
+def _top_k(payload):
+    top_k = _field(payload, "top_k", int, 5)
+    if top_k < 1:
+        raise ServiceError(400, "top_k must be at least 1")
+    return top_k
+
+
+class ScoringService:
+    def __init__(self, pdf_workers=None, max_concurrency=8, queue_timeout=0.5):
+        self.pdf_pool = ExtractionPool(pdf_workers or os.cpu_count() or 1)
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        self.queue_timeout = queue_timeout
+
+        self.routes = {
+            ("GET", "/health"): self.health,
+            ("POST", "/analyze"): self.analyze,
+            ("POST", "/rank-roles"): self.rank,
+            ("POST", "/detect-role"): self.detect,
+            ("POST", "/batch"): self.batch,
+        }
+
+        self.warm_up()
+
+    def warm_up(self):
+        ontology = get_ontology()
+        get_skill_matcher(ontology)
+        get_role_index(ontology)
+        get_role_classifier(ontology)
+
+    def close(self):
+        self.pdf_pool.shutdown()
+
+    def handle(self, method, path, payload=None):
+        if (method, path) == ("GET", "/metrics"):
+            return 200, METRICS.prometheus()
+
+        route = self.routes.get((method, path))
+        if route is None:
+            return 404, {"error": f"no route for {method} {path}"}
+        if payload is not None and not isinstance(payload, dict):
+            return 400, {"error": "request body must be a JSON object"}
+
+        if not self.slots.acquire(timeout=self.queue_timeout):
+            count("requests_rejected", path=path)
+            return 503, {"error": "server busy, retry later"}
+
+        try:
+            with span("request", path=path):
+                return 200, route(payload or {})
+        except ServiceError as e:
+            return e.status, {"error": str(e)}
+        except Exception as e:
+            count("requests_failed", path=path)
+            return 500, {"error": f"{type(e).__name__}: {e}"}
+        finally:
+            self.slots.release()
+
+    def _dispatch(self, path, payload):
+        method = "GET" if path == "/health" else "POST"
+        route = self.routes.get((method, path))
+        if route is None or route == self.batch:
+            raise ServiceError(404, f"no route for {path}")
+        if not isinstance(payload, dict):
+            raise ServiceError(400, "body must be an object")
+        return route(payload)
+
+    def _resume_texts(self, payload):
+        if "resume_text" in payload:
+            raw_text = _field(payload, "resume_text", str, "")
+        elif "resume_pdf_base64" in payload:
+            try:
+                data = base64.b64decode(_field(payload, "resume_pdf_base64", str, ""), validate=True)
+            except ValueError:
+                raise ServiceError(400, "resume_pdf_base64 is not valid base64")
+
+            # the pool's workers are killed if the budget runs out, so a hostile
+            # upload costs a worker respawn rather than a worker
+            try:
+                raw_text = extract_text(data, workers=1, time_budget=PDF_TIMEOUT, pool=self.pdf_pool)
+            except PdfTimedOut:
+                raise ServiceError(504, "PDF extraction timed out")
+            except PdfBudgetExceeded as e:
+                raise ServiceError(413, str(e))
+            except Exception as e:
+                raise ServiceError(422, f"could not read PDF: {e}")
+        else:
+            raise ServiceError(400, "provide resume_text or resume_pdf_base64")
+
+        if not raw_text.strip():
+            raise ServiceError(422, "no text could be extracted from the resume")
+
+        return clean_text(raw_text), raw_text
+
+    def health(self, payload):
+        return {"status": "ok", "ontology_version": get_ontology().version}
+
+    def detect(self, payload):
+        jd_text = _field(payload, "jd_text", str)
+        if not jd_text:
+            raise ServiceError(400, "jd_text is required")
+        return classify_role(jd_text, _top_k(payload))
+
+    def analyze(self, payload):
+        cleaned_resume, raw_text = self._resume_texts(payload)
+        jd_text = _field(payload, "jd_text", str, "").strip()
+        learn = _field(payload, "learn", bool, False)
+        target_role = None
+
+        if jd_text:
+            classification = classify_role(jd_text)
+            target_role = classification["role"]
+            learned = False
+            if target_role is None:
+                target_role = classification["inferred_role"]
+                if not learn:
+                    raise ServiceError(422, f"unknown role '{target_role}'; resend with learn=true to learn it")
+                build_new_role(target_role, jd_text)
+                learned = True
+            roles = [target_role]
+        else:
+            learned = False
+            roles = _field(payload, "roles", list) or DEFAULT_ROLES
+            if not all(isinstance(r, str) for r in roles):
+                raise ServiceError(400, "roles must be a list of strings")
+
+        unknown = [r for r in roles if r not in get_ontology().skills_dictionary]
+        if unknown:
+            raise ServiceError(400, f"unknown roles: {', '.join(unknown)}")
+
+        results = evaluate_cached(cleaned_resume, raw_text, dict.fromkeys(roles, ""))
+        return {"target_role": target_role, "learned_role": learned, "results": results}
+
+    def rank(self, payload):
+        cleaned_resume, raw_text = self._resume_texts(payload)
+        top_k = _top_k(payload)
+        return {"results": rank_roles(cleaned_resume, raw_text, top_k=top_k)}
+
+    def batch(self, payload):
+        requests = _field(payload, "requests", list)
+        if requests is None:
+            raise ServiceError(400, "requests must be a list")
+        if len(requests) > MAX_BATCH:
+            raise ServiceError(413, f"at most {MAX_BATCH} requests per batch")
+
+        responses = []
+        for item in requests:
+            if not isinstance(item, dict):
+                responses.append({"status": 400, "body": {"error": "each request must be an object"}})
+                continue
+            body = item.get("body")
+            try:
+                responses.append({"status": 200, "body": self._dispatch(item.get("path"), {} if body is None else body)})
+            except ServiceError as e:
+                responses.append({"status": e.status, "body": {"error": str(e)}})
+            except Exception as e:
+                # one bad item fails on its own, not the batch
+                count("requests_failed", path="/batch")
+                responses.append({"status": 500, "body": {"error": f"{type(e).__name__}: {e}"}})
+        return {"responses": responses}
+
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, status, body):
+            if isinstance(body, str):
+                data = body.encode("utf-8")
+                content_type = "text/plain; version=0.0.4"
+            else:
+                data = json.dumps(body, default=json_default).encode("utf-8")
+                content_type = "application/json"
+
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            if status == 503:
+                self.send_header("Retry-After", "1")
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            self._send(*service.handle("GET", self.path))
+
+        def do_POST(self):
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+            except ValueError:
+                length = -1
+            if length < 0:
+                self.close_connection = True
+                self._send(400, {"error": "invalid Content-Length"})
+                return
+            if length > MAX_BODY_BYTES:
+                self.close_connection = True
+                self._send(413, {"error": "request body too large"})
+                return
+
+            try:
+                payload = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                self._send(400, {"error": "body must be JSON"})
+                return
+
+            self._send(*service.handle("POST", self.path, payload))
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def make_server(service, host="127.0.0.1", port=8000):
+    return ThreadingHTTPServer((host, port), make_handler(service))
+
+
+class LocalClient:
+    def __init__(self, service):
+        self.service = service
+
+    def get(self, path):
+        return self.service.handle("GET", path)
+
+    def post(self, path, payload):
+        return self.service.handle("POST", path, json.loads(json.dumps(payload)))
+
+
+class HttpClient:
+    def __init__(self, base_url, timeout=60):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def _request(self, request):
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                status, data, content_type = response.status, response.read(), response.headers.get("Content-Type")
+        except urllib.error.HTTPError as e:
+            status, data, content_type = e.code, e.read(), e.headers.get("Content-Type")
+
+        if content_type and content_type.startswith("application/json"):
+            return status, json.loads(data)
+        return status, data.decode("utf-8")
+
+    def get(self, path):
+        return self._request(urllib.request.Request(self.base_url + path))
+
+    def post(self, path, payload):
+        request = urllib.request.Request(
+            self.base_url + path,
+            data=json.dumps(payload).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        return self._request(request)
+
+
+def encode_pdf(path):
+    with open(path, "rb") as f:
+        return base64.b64encode(f.read()).decode("ascii")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve resume analysis over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--pdf-workers", type=int, default=None)
+    parser.add_argument("--max-concurrency", type=int, default=8)
+    parser.add_argument("--queue-timeout", type=float, default=0.5,
+                        help="seconds a request may wait for a free slot before getting 503")
+    args = parser.parse_args(argv)
+
+    service = ScoringService(args.pdf_workers, args.max_concurrency, args.queue_timeout)
+    server = make_server(service, args.host, args.port)
+    print(f"Serving on http://{args.host}:{args.port}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,44 +1,19 @@
-import json
 import re
-from datetime import datetime
 from pathlib import Path
 from collections import Counter
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+from pipeline.skill_matcher import SkillMatcher
+from pipeline.role_index import RoleIndex, SQL_VARIANTS, TIERS, TIER_WEIGHTS
+from pipeline.role_result import RoleLayout, RoleResult, no_suitable_role
+from pipeline.skill_graph import get_skill_graph
+from pipeline.ontology import get_ontology
+from pipeline.normalizer import AliasTable, NormalizedDocument, normalize, repair_broken_spacing
+from pipeline.sections import SectionedDocument, segment_sections
+from pipeline.instrumentation import count, span, timed
 
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = BASE_DIR / "data"
 
-with open(DATA_DIR / "skills.json", encoding="utf-8") as f:
-    CONFIG = json.load(f)
-
-SKILLS_DICTIONARY = CONFIG["skills_dictionary"]
-ROLE_ALIASES = CONFIG["role_aliases"]
-SKILL_ALIASES = CONFIG.get("skill_aliases", {})
-
-DERIVED_SKILLS = {
-    "supervisedlearning": ["machine learning", "classification", "regression", "model training"],
-    "unsupervisedlearning": ["clustering", "dimensionality reduction"],
-    "featureengineering": ["data preprocessing", "feature extraction", "data cleaning"],
-    "statistics": ["statistical", "hypothesis", "probability"],
-    "datavisualization": ["visualization", "dashboard", "plot", "graph"],
-
-    "lessonplanning": ["lesson plan", "teaching plan", "course planning"],
-    "classroommanagement": ["discipline", "class control", "behavior management"],
-    "studentassessment": ["exam", "test", "grading", "evaluation"],
-    "curriculumdesign": ["syllabus", "curriculum", "course structure"]
-}
-
-
-def repair_broken_spacing(text):
-    fixed_lines = []
-    for line in text.splitlines():
-        if re.match(r'^(?:[A-Za-z]\s+){3,}[A-Za-z]$', line.strip()):
-            fixed_lines.append(line.replace(" ", ""))
-        else:
-            fixed_lines.append(line)
-    return "\n".join(fixed_lines)
 
 def rebuild_word_boundaries(text):
     text = re.sub(r'([a-z])([A-Z])', r'\1 \2', text)
@@ -46,66 +21,57 @@ def rebuild_word_boundaries(text):
     text = re.sub(r'(\d)([a-zA-Z])', r'\1 \2', text)
     return text
 
-def normalize(text):
-    text = text.lower()
-    text = re.sub(r'(?<=\b[a-z])\s+(?=[a-z]\b)', '', text)
-    text = text.replace("postgre sql", "postgresql")
-    text = text.replace("my sql", "mysql")
-    text = text.replace("sci kit learn", "scikitlearn")
-    text = re.sub(r'[^a-z0-9+.# ]', ' ', text)
-    text = re.sub(r'\s+', ' ', text).strip()
-    return text
-
-def normalize_skill(skill):
-    return SKILL_ALIASES.get(skill, skill)
-
-def extract_project_sections(text):
-    lines = text.splitlines()
-    capture = False
-    collected = []
-
-    for line in lines:
-        clean = line.strip().lower()
+def normalize_skill(skill, ontology=None):
+    ontology = ontology or get_ontology()
+    return ontology.skill_aliases.get(skill, skill)
 
-        if clean in ["projects", "project experience"]:
-            capture = True
-            continue
+def _build_skill_matcher(ontology):
+    skills = {
+        normalize_skill(skill, ontology)
+        for role_skills in ontology.skills_dictionary.values()
+        for tier in ["core", "preferred", "tools"]
+        for skill in role_skills[tier]
+    }
+    return SkillMatcher(skills, get_skill_graph(ontology).triggers)
 
-        if capture and clean in ["education", "skills", "summary", "experience"]:
-            break
 
-        if capture and line.strip():
-            collected.append(line)
+def get_skill_matcher(ontology=None):
+    ontology = ontology or get_ontology()
+    return ontology.derived("skill_matcher", _build_skill_matcher)
 
-    return " ".join(collected)
 
+def get_alias_table(ontology=None):
+    ontology = ontology or get_ontology()
+    return ontology.derived("alias_table", lambda o: AliasTable(o.skill_aliases))
 
-def extract_skills(text, role):
-    text = normalize(text)
-    found = {"core": Counter(), "preferred": Counter(), "tools": Counter()}
 
-    role = ROLE_ALIASES.get(role, role)
-    role_skills = SKILLS_DICTIONARY[role]
+def scan_skills(text, ontology=None):
+    ontology = ontology or get_ontology()
 
-    for tier in ["core", "preferred", "tools"]:
-        for skill in role_skills[tier]:
-            skill_norm = normalize_skill(skill)
-            pattern = rf'\b{re.escape(skill_norm)}\b'
+    if isinstance(text, NormalizedDocument):
+        text = text.text
+    else:
+        text = normalize(text)
+    return get_skill_matcher(ontology).scan(get_alias_table(ontology).rewrite(text))
 
-            if re.search(pattern, text):
-                found[tier][skill_norm] += 1
 
-                if skill_norm in ("postgresql", "mysql"):
-                    found["core"]["sql"] += 1
+def scan_normalized(text, ontology=None, matcher=None):
+    # text stored after normalize(); aliases are applied here so that changing them
+    # never needs the original document
+    ontology = ontology or get_ontology()
+    return (matcher or get_skill_matcher(ontology)).scan(get_alias_table(ontology).rewrite(text))
 
-            else:
-                if tier in ("core", "preferred"):
-                    for trigger in DERIVED_SKILLS.get(skill_norm, []):
-                        if trigger in text:
-                            found[tier][skill_norm] += 0.5
 
+def extract_skills(text, role):
+    # the skills of text per tier of role, counted by the same rules as score_role
+    ontology = get_ontology()
+    hits = scan_skills(text, ontology)
+    layout = get_role_layouts(ontology)[role]
 
-    return found
+    counts = [0] * len(layout.names)
+    _tally(hits, layout, get_skill_graph(ontology).credits(hits), counts)
+    return {tier: Counter({layout.names[i]: counts[i] for i in range(start, end) if counts[i]})
+            for tier, (start, _, end) in zip(TIERS, layout.tiers)}
 
 
 def compare_skills(resume, target):
@@ -124,6 +90,12 @@ def compare_skills(resume, target):
     return report
 
 
+def extract_project_sections(text):
+    # kept for existing callers; scoring reads the spans of a SectionedDocument
+    return " ".join(line for section, start, end in segment_sections(text) if section == "projects"
+                    for line in text[start:end].splitlines() if line.strip())
+
+
 def compute_weighted_score(report):
     weights = {"core": 3, "preferred": 1.5, "tools": 1}
 
@@ -142,68 +114,98 @@ def compute_weighted_score(report):
 
 MIN_ACCEPTABLE_SCORE = 10
 
-def evaluate_multiple_roles(cleaned_resume, raw_resume, jd_texts):
-    raw_resume = repair_broken_spacing(raw_resume)
-    cleaned_resume = repair_broken_spacing(cleaned_resume)
+def prepare_resume_hits(cleaned_resume, raw_resume, ontology=None):
+    ontology = ontology or get_ontology()
 
-    project_text = extract_project_sections(raw_resume)
+    # the raw text still has its line breaks, so the sections can be told apart; it
+    # normalizes to the cleaned text, minus clean_text gluing adjacent spaced-out lines
+    doc = SectionedDocument(raw_resume or cleaned_resume, get_alias_table(ontology).rewrite)
+    hits = get_skill_matcher(ontology).scan(doc.text)
 
-    results = []
+    # one scan: project hits are the ones that fall inside the project sections
+    return hits, hits.within(doc.spans("projects"))
 
-    for role in jd_texts:
-        resume_skills = extract_skills(cleaned_resume, role)
-        project_skills = extract_skills(project_text, role)
 
-        for tier in project_skills:
-            for skill, count in project_skills[tier].items():
-                PROJECT_MULTIPLIER = 3
+def _build_role_layouts(ontology):
+    layouts = {}
+    for role, targets in ontology.skills_dictionary.items():
+        source = ontology.skills_dictionary[ontology.role_aliases.get(role, role)]
+        sources = {tier: [normalize_skill(s, ontology) for s in source[tier]] for tier in TIERS}
+        layouts[role] = RoleLayout.build(role, targets, sources)
+    return layouts
 
-                for tier in project_skills:
-                    for skill, count in project_skills[tier].items():
-                        resume_skills[tier][skill] += count * PROJECT_MULTIPLIER
 
+def get_role_layouts(ontology=None):
+    ontology = ontology or get_ontology()
+    return ontology.derived("role_layouts", _build_role_layouts)
 
-        target = {
-            tier: {s: 1 for s in SKILLS_DICTIONARY[role][tier]}
-            for tier in ["core", "preferred", "tools"]
-        }
 
-        report = compare_skills(resume_skills, target)
-        score = compute_weighted_score(report)
-        core_matches = len(report["core"]["matched"])
+def _tally(hits, layout, credits, counts):
+    # counts straight into the layout's slots
+    for tier_id, slots in enumerate(layout.sources):
+        for slot in slots:
+            skill = layout.names[slot]
 
-        if core_matches == 0:
-            continue
+            if skill in hits.skills:
+                counts[slot] += 1
 
-        verdict = (
-            "STRONG FIT" if score >= 70 else
-            "MODERATE FIT" if score >= 40 else
-            "NOT HIRE READY"
-        )
+                if skill in SQL_VARIANTS:
+                    counts[layout.sql_slot] += 1
 
-        results.append({"role": role, "score": score, "verdict": verdict, "report": report})
+            elif tier_id < 2 and skill in credits:
+                counts[slot] += credits[skill]
 
-    valid_results = []
-    for r in results:
-        total_matches = sum(len(r["report"][tier]["matched"]) for tier in ["core", "preferred", "tools"])
-        if total_matches > 0:
-            valid_results.append(r)
 
-    if not valid_results:
-        return [{
-            "role": "none",
-            "score": 0.0,
-            "verdict": "NO SUITABLE ROLE FOUND",
-            "report": {
-                "core": {"matched": None, "missing": None, "extra": None},
-                "preferred": {"matched": None, "missing": None, "extra": None},
-                "tools": {"matched": None, "missing": None, "extra": None}
-            }
-     }]
+PROJECT_MULTIPLIER = 3
 
-    valid_results.sort(key=lambda x: x["score"], reverse=True)
 
-    best = valid_results[0]
+def score_role(resume_hits, project_hits, role, ontology=None):
+    ontology = ontology or get_ontology()
+    layout = get_role_layouts(ontology)[role]
+    graph = get_skill_graph(ontology)
+
+    counts = [0] * len(layout.names)
+    _tally(resume_hits, layout, graph.credits(resume_hits), counts)
+
+    project = [0] * len(layout.names)
+    _tally(project_hits, layout, graph.credits(project_hits), project)
+
+    # every project skill is credited once per project skill found, as it always has been
+    found = sum(1 for c in project if c)
+    for slot, c in enumerate(project):
+        if c:
+            for _ in range(found):
+                counts[slot] += c * PROJECT_MULTIPLIER
+
+    total = 0
+    possible = 0
+    core_matches = 0
+
+    for tier, (start, target_end, _) in zip(TIERS, layout.tiers):
+        w = TIER_WEIGHTS[tier]
+        matched = sum(1 for i in range(start, target_end) if counts[i])
+        missing = target_end - start - matched
+
+        total += matched * w
+        possible += (matched + missing) * w
+        if tier == "core":
+            core_matches = matched
+
+    if core_matches == 0:
+        return None
+
+    score = round((total / possible) * 100, 2) if possible else 0
+
+    verdict = (
+        "STRONG FIT" if score >= 70 else
+        "MODERATE FIT" if score >= 40 else
+        "NOT HIRE READY"
+    )
+
+    return RoleResult(role, score, verdict, layout, counts)
+
+
+def apply_best_verdict(best):
     if best["score"] < MIN_ACCEPTABLE_SCORE:
         best["verdict"] = "NO SUITABLE ROLE FOUND"
     elif best["score"] >= 70:
@@ -217,8 +219,69 @@ def evaluate_multiple_roles(cleaned_resume, raw_resume, jd_texts):
     else:
         best["verdict"] = "NOT HIRE READY"
 
+
+@timed("evaluate_multiple_roles")
+def evaluate_multiple_roles(cleaned_resume, raw_resume, jd_texts, ontology=None):
+    ontology = ontology or get_ontology()
+    resume_hits, project_hits = prepare_resume_hits(cleaned_resume, raw_resume, ontology)
+
+    results = []
+
+    for role in jd_texts:
+        with span("score_role"):
+            result = score_role(resume_hits, project_hits, role, ontology)
+        if result is not None:
+            results.append(result)
+
+    count("roles_scored", len(jd_texts))
+
+    return rank_results(results)
+
+
+def rank_results(results):
+    valid_results = []
+    for r in results:
+        if isinstance(r, RoleResult):
+            total_matches = sum(r.matched_counts())
+        else:
+            total_matches = sum(len(r["report"][tier]["matched"]) for tier in ["core", "preferred", "tools"])
+        if total_matches > 0:
+            valid_results.append(r)
+
+    if not valid_results:
+        return [no_suitable_role()]
+
+    valid_results.sort(key=lambda x: x["score"], reverse=True)
+
+    apply_best_verdict(valid_results[0])
+
     return valid_results
 
+
+def _build_role_index(ontology):
+    return RoleIndex(ontology.skills_dictionary, ontology.role_aliases, ontology.skill_aliases, get_skill_graph(ontology))
+
+
+def get_role_index(ontology=None):
+    ontology = ontology or get_ontology()
+    return ontology.derived("role_index", _build_role_index)
+
+
+def rank_roles(cleaned_resume, raw_resume, top_k=None, roles=None):
+    ontology = get_ontology()
+    resume_hits, project_hits = prepare_resume_hits(cleaned_resume, raw_resume, ontology)
+
+    index = get_role_index(ontology)
+    ranked = index.rank(index.resume_keys(resume_hits, project_hits), roles=roles, top_k=top_k)
+
+    if not ranked:
+        return [no_suitable_role()]
+
+    results = [score_role(resume_hits, project_hits, role, ontology) for role, _ in ranked]
+    apply_best_verdict(results[0])
+
+    return results
+
 def generate_learning_plan(report):
     plan = []
     for tier in ["core", "preferred", "tools"]:
@@ -246,29 +309,19 @@ def explain_gaps(report):
     return "\n".join(lines) if lines else "No major skill gaps detected."
 
 def save_final_report(result):
+    from pipeline.reports import render_txt_report, report_stem
+
     out = Path("outputs")
     out.mkdir(exist_ok=True)
-    path = out / f"career_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
-
-    with open(path, "w", encoding="utf-8") as f:
-        f.write(f"Role: {result['role']}\nScore: {result['score']}%\nVerdict: {result['verdict']}\n")
+    path = out / f"{report_stem()}.txt"
+    path.write_bytes(render_txt_report(result))
 
     return path
 
 
 def generate_pdf_report(result, txt_path):
+    from pipeline.reports import render_pdf_report
+
     pdf = txt_path.with_suffix(".pdf")
-    styles = getSampleStyleSheet()
-    story = [
-        Paragraph("Career Fit Report", styles["Title"]),
-        Paragraph(f"Role: {result['role']}", styles["Heading2"]),
-        Paragraph(f"Score: {result['score']}%", styles["BodyText"]),
-        Paragraph(f"Verdict: {result['verdict']}", styles["BodyText"]),
-        Spacer(1, 12),
-    ]
-
-    for step in generate_learning_plan(result["report"]):
-        story.append(Paragraph(step, styles["BodyText"]))
-
-    SimpleDocTemplate(str(pdf)).build(story)
+    pdf.write_bytes(render_pdf_report(result))
     return pdf
@@ -0,0 +1,62 @@
+from collections import defaultdict
+
+from pipeline.ontology import get_ontology
+
+DERIVED_CREDIT = 0.5
+
+
+def _edges(derived_skills):
+    for skill, sources in derived_skills.items():
+        for source in sources:
+            if isinstance(source, dict):
+                term, credit = source["term"], source.get("credit", DERIVED_CREDIT)
+            else:
+                term, credit = source, DERIVED_CREDIT
+
+            if not 0 < credit <= 1:
+                raise ValueError(f"credit for {term!r} -> {skill!r} must be in (0, 1], got {credit}")
+            yield term, skill, credit
+
+
+class SkillGraph:
+    def __init__(self, derived_skills):
+        incoming = defaultdict(dict)
+        for term, skill, credit in _edges(derived_skills):
+            incoming[skill][term] = max(credit, incoming[skill].get(term, 0))
+
+        # closure: every term that implies a skill through any chain, with the best
+        # product of edge credits along the way (credits <= 1, so cycles stop by themselves)
+        self.evidence = {}
+        for skill in incoming:
+            best = {}
+            stack = [(skill, 1.0)]
+            while stack:
+                node, credit = stack.pop()
+                for term, edge in incoming.get(node, {}).items():
+                    reached = credit * edge
+                    if term != skill and reached > best.get(term, 0):
+                        best[term] = reached
+                        stack.append((term, reached))
+            self.evidence[skill] = best
+
+        self.implies = defaultdict(list)
+        for skill, terms in self.evidence.items():
+            for term, credit in terms.items():
+                self.implies[term].append((skill, credit))
+
+        self.triggers = frozenset(self.implies)
+
+    def implied(self, hits):
+        return {skill for term in hits.triggers for skill, _ in self.implies.get(term, ())}
+
+    def credits(self, hits):
+        credits = {}
+        for term in hits.triggers:
+            for skill, credit in self.implies.get(term, ()):
+                credits[skill] = credits.get(skill, 0) + credit
+        return credits
+
+
+def get_skill_graph(ontology=None):
+    ontology = ontology or get_ontology()
+    return ontology.derived("skill_graph", lambda o: SkillGraph(o.derived_skills))
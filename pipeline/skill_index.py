@@ -0,0 +1,472 @@
+import argparse
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+from pipeline.ontology import BASE_DIR, get_ontology
+from pipeline.skill_engine import get_skill_matcher, normalize_skill
+
+INDEX_PATH = BASE_DIR / "outputs" / "skill_index.bin"
+INDEX_MAGIC = b"skillidx"
+
+# roaring layout: ids are split by their high 16 bits into containers holding
+# either a sorted uint16 array (sparse) or a 65536-bit bitmap (dense)
+ARRAY_MAX = 4096
+BITMAP_WORDS = 1024
+INELIGIBLE = -1
+SCORE_BITS = 14
+DENSE_CACHE = 256
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.int64)
+_TOKEN = re.compile(r'\s*(?:(\()|(\))|\b(and|or|not)\b|"([^"]*)"|([^\s()"]+))', re.I)
+
+
+def _to_words(values):
+    bits = np.zeros(BITMAP_WORDS * 64, dtype=bool)
+    bits[values] = True
+    return np.packbits(bits, bitorder="little").view(np.uint64)
+
+
+def _is_bitmap(container):
+    return container.dtype == np.uint64
+
+
+class Bitmap:
+    __slots__ = ("containers",)
+
+    def __init__(self, containers=None):
+        self.containers = containers or {}
+
+    @staticmethod
+    def from_ids(ids):
+        ids = np.unique(np.asarray(ids, dtype=np.int64))
+        containers = {}
+        keys = ids >> 16
+        bounds = np.flatnonzero(np.diff(keys)) + 1
+        for chunk in np.split(ids, bounds) if len(ids) else ():
+            values = (chunk & 0xFFFF).astype(np.uint16)
+            containers[int(chunk[0] >> 16)] = values if len(values) <= ARRAY_MAX else _to_words(values)
+        return Bitmap(containers)
+
+
+def parse_query(expression):
+    tokens = []
+    pos = 0
+    expression = expression.strip()
+    while pos < len(expression):
+        m = _TOKEN.match(expression, pos)
+        if not m or m.end() == pos:
+            raise ValueError(f"cannot parse query at: {expression[pos:]!r}")
+        pos = m.end()
+        lparen, rparen, op, quoted, word = m.groups()
+        if lparen or rparen or op:
+            tokens.append(lparen or rparen or op.upper())
+        elif tokens and isinstance(tokens[-1], list):
+            # consecutive words form one multi-word skill ("lesson planning")
+            tokens[-1].append(quoted if quoted is not None else word)
+        else:
+            tokens.append([quoted if quoted is not None else word])
+
+    tree, pos = _parse_or(tokens, 0)
+    if pos != len(tokens):
+        raise ValueError(f"unexpected {tokens[pos]!r} in query")
+    return tree
+
+
+def _parse_or(tokens, pos):
+    left, pos = _parse_and(tokens, pos)
+    while pos < len(tokens) and tokens[pos] == "OR":
+        right, pos = _parse_and(tokens, pos + 1)
+        left = ("or", left, right)
+    return left, pos
+
+
+def _parse_and(tokens, pos):
+    left, pos = _parse_not(tokens, pos)
+    while pos < len(tokens) and tokens[pos] == "AND":
+        right, pos = _parse_not(tokens, pos + 1)
+        left = ("and", left, right)
+    return left, pos
+
+
+def _parse_not(tokens, pos):
+    if pos >= len(tokens):
+        raise ValueError("query ends unexpectedly")
+    token = tokens[pos]
+    if token == "NOT":
+        operand, pos = _parse_not(tokens, pos + 1)
+        return ("not", operand), pos
+    if token == "(":
+        inner, pos = _parse_or(tokens, pos + 1)
+        if pos >= len(tokens) or tokens[pos] != ")":
+            raise ValueError("missing ) in query")
+        return inner, pos + 1
+    if isinstance(token, list):
+        return ("skill", " ".join(token).lower()), pos + 1
+    raise ValueError(f"unexpected {token!r} in query")
+
+
+def _align(f):
+    pad = -f.tell() % 8
+    f.write(b"\0" * pad)
+
+
+def _n_words(n_docs):
+    # whole containers, so roaring containers map straight onto word ranges
+    return -(-n_docs // 65536) * BITMAP_WORDS
+
+
+def _pack(bits, n_words):
+    padded = np.zeros(n_words * 64, dtype=bool)
+    padded[:len(bits)] = bits
+    return np.packbits(padded, bitorder="little").view(np.uint64)
+
+
+def write_index(path, hashes, skill_docs, role_scores, version=None):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    n_words = _n_words(len(hashes))
+    header = {"version": version, "n_docs": len(hashes), "skills": {}, "roles": {}}
+
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name + ".")
+    try:
+        with os.fdopen(fd, "wb") as data:
+            header["hashes"] = data.tell()
+            data.write(b"".join(bytes.fromhex(h) for h in hashes))
+
+            # scores are stored bit-sliced: one bitmap of eligible resumes, then one
+            # bitmap per bit of the centi-score, so range filters and top-k are bitmap ops
+            for role, scores in role_scores.items():
+                scores = np.asarray(scores, dtype=np.int16)
+                eligible = scores >= 0
+                _align(data)
+                header["roles"][role] = data.tell()
+                data.write(_pack(eligible, n_words).tobytes())
+                for bit in range(SCORE_BITS):
+                    data.write(_pack(eligible & ((scores >> bit) & 1).astype(bool), n_words).tobytes())
+
+            for skill, ids in skill_docs.items():
+                directory = []
+                for key, container in sorted(Bitmap.from_ids(ids).containers.items()):
+                    _align(data)
+                    directory.append([key, data.tell(), len(container), int(_is_bitmap(container))])
+                    data.write(container.tobytes())
+                header["skills"][skill] = directory
+
+        blob = json.dumps(header).encode("utf-8")
+        blob += b" " * (-(len(INDEX_MAGIC) + 8 + len(blob)) % 8)
+        with open(tmp, "rb") as data, open(tmp + ".h", "wb") as f:
+            f.write(INDEX_MAGIC + struct.pack("<Q", len(blob)) + blob)
+            while True:
+                chunk = data.read(1 << 20)
+                if not chunk:
+                    break
+                f.write(chunk)
+        os.replace(tmp + ".h", path)
+        os.chmod(path, 0o644)
+    finally:
+        for leftover in (tmp, tmp + ".h"):
+            if os.path.exists(leftover):
+                os.unlink(leftover)
+
+
+def build_from_store(store, path=INDEX_PATH, ontology=None):
+    ontology = ontology or get_ontology()
+    store.sync(ontology)
+
+    vocabulary = get_skill_matcher(ontology).skills
+    profiles = store.profiles()
+    doc_ids = {p.hash: i for i, p in enumerate(profiles)}
+
+    skill_docs = {}
+    for i, profile in enumerate(profiles):
+        for skill in (profile.resume_skills | profile.project_skills) & vocabulary:
+            skill_docs.setdefault(skill, []).append(i)
+
+    role_scores = {role: np.full(len(profiles), INELIGIBLE, dtype=np.int16) for role in ontology.skills_dictionary}
+    for content_hash, role, score in store.score_rows():
+        if role in role_scores:
+            role_scores[role][doc_ids[content_hash]] = round(score * 100)
+
+    write_index(path, [p.hash for p in profiles], skill_docs, role_scores, ontology.version)
+    return len(profiles)
+
+
+def _word_counts(words):
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(words)
+    return _POPCOUNT[words.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+def _count(words):
+    return int(_word_counts(words).sum())
+
+
+def _dense_ids(words, offset=0, limit=None, word_ids=None):
+    # only the non-empty words are unpacked, located via running popcounts
+    nonzero = np.flatnonzero(words)
+    skip = 0
+    if offset or limit is not None:
+        ends = np.cumsum(_word_counts(words[nonzero]))
+        first = int(np.searchsorted(ends, offset, side="right"))
+        last = len(nonzero) if limit is None else int(np.searchsorted(ends, offset + limit, side="left")) + 1
+        skip = offset - (int(ends[first - 1]) if first else 0)
+        nonzero = nonzero[first:last]
+
+    bits = np.unpackbits(words[nonzero].view(np.uint8), bitorder="little").reshape(-1, 64)
+    rows, cols = np.nonzero(bits)
+    ids = (nonzero if word_ids is None else word_ids[nonzero])[rows] * 64 + cols
+    return ids[skip:] if limit is None else ids[skip:skip + limit]
+
+
+def _score_range(eligible, slices, low=None, high=None):
+    largest = (1 << SCORE_BITS) - 1
+    if (low is not None and low > largest) or (high is not None and high < 0):
+        return np.zeros_like(eligible)
+    high = None if high is None else min(high, largest)
+    result = eligible.copy()
+
+    if low is not None and low > 0:
+        greater = np.zeros_like(eligible)
+        equal = eligible.copy()
+        for bit in range(SCORE_BITS - 1, -1, -1):
+            if (low >> bit) & 1:
+                equal &= slices[bit]
+            else:
+                greater |= equal & slices[bit]
+                equal &= ~slices[bit]
+        result &= greater | equal
+
+    if high is not None:
+        less = np.zeros_like(eligible)
+        equal = eligible.copy()
+        for bit in range(SCORE_BITS - 1, -1, -1):
+            if (high >> bit) & 1:
+                less |= equal & ~slices[bit]
+                equal &= slices[bit]
+            else:
+                equal &= ~slices[bit]
+        result &= less | equal
+
+    return result
+
+
+def _top(slices, candidates, k, word_ids):
+    # walk the score bits from the top: resumes with the bit set either all
+    # make the cut or contain it; ties left at the end go by index order
+    remaining = _count(candidates)
+    if remaining <= k:
+        return _dense_ids(candidates, word_ids=word_ids)
+
+    chosen = []
+    for bit in range(SCORE_BITS - 1, -1, -1):
+        higher = candidates & slices[bit]
+        n = _count(higher)
+        if n > k:
+            candidates, remaining = higher, n
+        else:
+            chosen.append(_dense_ids(higher, word_ids=word_ids))
+            candidates, remaining, k = candidates & ~slices[bit], remaining - n, k - n
+            if k == 0:
+                break
+
+        # once few resumes are left, carry on with just the words holding them
+        if remaining * 4 < len(candidates):
+            nonzero = np.flatnonzero(candidates)
+            candidates, slices, word_ids = candidates[nonzero], slices[:, nonzero], word_ids[nonzero]
+
+    chosen.append(_dense_ids(candidates, 0, k, word_ids=word_ids))
+    return np.concatenate(chosen)
+
+
+class SkillIndex:
+    def __init__(self, path=INDEX_PATH, cache_size=DENSE_CACHE):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mm[:len(INDEX_MAGIC)] != INDEX_MAGIC:
+            raise ValueError(f"{path} is not a skill index")
+        (size,) = struct.unpack_from("<Q", self._mm, len(INDEX_MAGIC))
+        start = len(INDEX_MAGIC) + 8
+        header = json.loads(self._mm[start:start + size])
+        self._base = start + size
+
+        self.version = header["version"]
+        self.n_docs = header["n_docs"]
+        self.n_words = _n_words(self.n_docs)
+        self.roles = list(header["roles"])
+        self.skills = list(header["skills"])
+        self._skills = header["skills"]
+        self._roles = header["roles"]
+        self._hashes = header["hashes"]
+
+        # queried skills are kept decoded, most recently used last
+        self._dense = OrderedDict()
+        self._cache_size = cache_size
+        self.universe = _pack(np.ones(self.n_docs, dtype=bool), self.n_words)
+
+    def close(self):
+        self._dense.clear()
+        self._mm.close()
+
+    def _view(self, dtype, offset, count):
+        return np.frombuffer(self._mm, dtype=dtype, count=count, offset=self._base + offset)
+
+    def bitmap(self, name, ontology=None):
+        if name not in self._skills:
+            # the header only lists skills some indexed resume has
+            if name in get_skill_matcher(ontology or get_ontology()).skills:
+                return Bitmap()
+            raise ValueError(f"unknown skill: {name}")
+        containers = {}
+        for key, offset, length, dense in self._skills[name]:
+            containers[key] = self._view(np.uint64 if dense else np.uint16, offset, length)
+        return Bitmap(containers)
+
+    def skill(self, name, ontology=None):
+        ontology = ontology or get_ontology()
+        vocabulary = get_skill_matcher(ontology).skills
+        name = normalize_skill(name, ontology)
+        if name not in self._skills and name not in vocabulary:
+            # "lesson planning" is indexed as "lessonplanning"
+            name = normalize_skill("".join(name.split()), ontology)
+
+        words = self._dense.get(name)
+        if words is not None:
+            self._dense.move_to_end(name)
+            return words
+
+        words = np.zeros(self.n_words, dtype=np.uint64)
+        for key, container in self.bitmap(name, ontology).containers.items():
+            start = key * BITMAP_WORDS
+            words[start:start + BITMAP_WORDS] = container if _is_bitmap(container) else _to_words(container)
+
+        self._dense[name] = words
+        if len(self._dense) > self._cache_size:
+            self._dense.popitem(last=False)
+        return words
+
+    def _slices(self, role):
+        if role not in self._roles:
+            raise ValueError(f"unknown role: {role}")
+        planes = self._view(np.uint64, self._roles[role], self.n_words * (SCORE_BITS + 1))
+        planes = planes.reshape(SCORE_BITS + 1, self.n_words)
+        return planes[0], planes[1:]
+
+    def content_hash(self, doc_id):
+        offset = self._base + self._hashes + doc_id * 32
+        return self._mm[offset:offset + 32].hex()
+
+    def scores(self, role, ids):
+        _, slices = self._slices(role)
+        ids = np.asarray(ids, dtype=np.int64)
+        words, shift = ids >> 6, (ids & 63).astype(np.uint64)
+        centi = np.zeros(len(ids), dtype=np.int64)
+        for bit in range(SCORE_BITS):
+            centi |= ((slices[bit][words] >> shift) & np.uint64(1)).astype(np.int64) << bit
+        return centi
+
+    def evaluate(self, tree, ontology=None):
+        kind = tree[0]
+        if kind == "skill":
+            return self.skill(tree[1], ontology)
+        if kind == "not":
+            return self.universe & ~self.evaluate(tree[1], ontology)
+        left = self.evaluate(tree[1], ontology)
+        right = self.evaluate(tree[2], ontology)
+        return left & right if kind == "and" else left | right
+
+    def search(self, expression=None, role=None, min_score=None, max_score=None, offset=0, limit=20):
+        if (min_score is not None or max_score is not None) and role is None:
+            raise ValueError("a score filter needs a role")
+
+        words = self.evaluate(parse_query(expression), get_ontology()) if expression else self.universe
+
+        if role is None:
+            page = _dense_ids(words, offset, limit)
+            return {"total": _count(words),
+                    "results": [{"hash": self.content_hash(int(i)), "score": None} for i in page]}
+
+        eligible, slices = self._slices(role)
+        active = np.arange(self.n_words)
+        if expression:
+            nonzero = np.flatnonzero(words)
+            # a selective query only needs the words it left non-empty
+            if len(nonzero) * 4 < self.n_words:
+                active, words = nonzero, words[nonzero]
+                eligible, slices = eligible[nonzero], slices[:, nonzero]
+
+        rest = None
+        if min_score is None and max_score is None:
+            ranked = words & eligible
+            # resumes that cannot be scored for the role come last, in index order
+            rest = words & ~eligible
+        else:
+            low = math.ceil(min_score * 100 - 1e-9) if min_score is not None else None
+            high = math.floor(max_score * 100 + 1e-9) if max_score is not None else None
+            ranked = words & _score_range(eligible, slices, low, high)
+
+        total = _count(ranked)
+        ids = _top(slices, ranked, offset + limit, active)
+        centi = self.scores(role, ids)
+        order = np.lexsort((ids, -centi))[offset:]
+        results = [{"hash": self.content_hash(int(ids[i])), "score": int(centi[i]) / 100} for i in order]
+        if rest is not None:
+            extra = _dense_ids(rest, max(0, offset - total), limit - len(results), active)
+            results.extend({"hash": self.content_hash(int(i)), "score": None} for i in extra)
+            total += _count(rest)
+
+        return {"total": total, "results": results}
+
+
+def main(argv=None):
+    from pipeline.profile_store import PROFILE_DB, ProfileStore
+
+    parser = argparse.ArgumentParser(description="Search analyzed resumes by skill combination and role score.")
+    parser.add_argument("--index", default=str(INDEX_PATH))
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="(re)build the index from the profile store")
+    build.add_argument("--db", default=str(PROFILE_DB))
+
+    query = sub.add_parser("query", help='e.g. "pytorch AND docker AND NOT kubernetes"')
+    query.add_argument("expression", nargs="?")
+    query.add_argument("--role")
+    query.add_argument("--min-score", type=float)
+    query.add_argument("--max-score", type=float)
+    query.add_argument("--offset", type=int, default=0)
+    query.add_argument("--limit", type=int, default=20)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        store = ProfileStore(args.db)
+        try:
+            print(json.dumps({"indexed": build_from_store(store, args.index)}), file=sys.stderr)
+        finally:
+            store.close()
+        return
+
+    index = SkillIndex(args.index)
+    try:
+        if index.version != get_ontology().version:
+            print("warning: index was built for an older ontology; run build again", file=sys.stderr)
+        print(json.dumps(index.search(args.expression, args.role, args.min_score, args.max_score,
+                                      args.offset, args.limit)))
+    except ValueError as e:
+        parser.error(str(e))
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
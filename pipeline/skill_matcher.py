@@ -0,0 +1,114 @@
+import re
+from bisect import bisect_right
+from collections import defaultdict
+
+
+def _build_trie(words):
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = True
+    return trie
+
+
+def _trie_to_regex(node):
+    branches = [re.escape(ch) + _trie_to_regex(child) for ch, child in sorted(node.items()) if ch]
+
+    if not branches:
+        return ""
+
+    body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+
+    # greedy optional group: prefer the longest word, backtrack to a shorter one
+    if "" in node:
+        return "(?:" + body + ")?"
+    return body
+
+
+def trie_pattern(words):
+    words = sorted({w for w in words if w})
+    if not words:
+        return "(?!)"
+    return _trie_to_regex(_build_trie(words))
+
+
+def _prefix_words(words):
+    words = set(words)
+    prefixes = {}
+    for word in words:
+        prefixes[word] = [word[:i] for i in range(len(word) - 1, 0, -1) if word[:i] in words]
+    return prefixes
+
+
+def _is_word_char(ch):
+    return ch.isalnum() or ch == "_"
+
+
+def _is_boundary(text, pos):
+    before = pos > 0 and _is_word_char(text[pos - 1])
+    after = pos < len(text) and _is_word_char(text[pos])
+    return before != after
+
+
+class SkillHits:
+    __slots__ = ("skills", "triggers")
+
+    def __init__(self):
+        self.skills = defaultdict(list)
+        self.triggers = defaultdict(list)
+
+    def within(self, spans):
+        # the hits that lie entirely inside one of the sorted (start, end) spans
+        hits = SkillHits()
+        if not spans:
+            return hits
+
+        starts = [start for start, _ in spans]
+        for found, kept in ((self.skills, hits.skills), (self.triggers, hits.triggers)):
+            for term, positions in found.items():
+                for start, end in positions:
+                    i = bisect_right(starts, start) - 1
+                    if i >= 0 and end <= spans[i][1]:
+                        kept[term].append((start, end))
+        return hits
+
+
+class SkillMatcher:
+    def __init__(self, skills, triggers=()):
+        self.skills = frozenset(s for s in skills if s)
+        self.triggers = frozenset(t for t in triggers if t)
+
+        self._skill_prefixes = _prefix_words(self.skills)
+        self._trigger_prefixes = _prefix_words(self.triggers)
+
+        skill_re = rf'\b(?:{trie_pattern(self.skills)})\b'
+        trigger_re = trie_pattern(self.triggers)
+
+        # the skill alternation is by far the larger one, so it appears only once
+        self._pattern = re.compile(
+            rf'(?:(?=({skill_re}))(?=({trigger_re}))?|(?=({trigger_re})))'
+        )
+
+    def scan(self, text):
+        hits = SkillHits()
+
+        for m in self._pattern.finditer(text):
+            start = m.start()
+            skill = m.group(1)
+            trigger = m.group(2) or m.group(3)
+
+            if skill:
+                hits.skills[skill].append((start, start + len(skill)))
+                for prefix in self._skill_prefixes[skill]:
+                    end = start + len(prefix)
+                    if _is_boundary(text, end):
+                        hits.skills[prefix].append((start, end))
+
+            if trigger:
+                hits.triggers[trigger].append((start, start + len(trigger)))
+                for prefix in self._trigger_prefixes[trigger]:
+                    hits.triggers[prefix].append((start, start + len(prefix)))
+
+        return hits
@@ -1,6 +1,8 @@
 import re
 from pathlib import Path
+from pipeline.instrumentation import timed
 
+@timed("clean_text")
 def clean_text(text):
     text = re.sub(r'(?<=\b[a-zA-Z])\s+(?=[a-zA-Z]\b)', '', text)
     text = text.lower()
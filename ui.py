@@ -1,44 +1,67 @@
-from pathlib import Path
+import hashlib
+
 import streamlit as st
-import tempfile
-import os
 
-from pipeline.full_resume_extractor import extract_text_from_pdf
+from pipeline.full_resume_extractor import extract_text, content_hash, PdfBudgetExceeded
 from pipeline.text_cleaner import clean_text
+from pipeline.ontology import get_ontology
+from pipeline.reports import report_stem, submit_reports
 from pipeline.skill_engine import (
-    evaluate_multiple_roles,
-    save_final_report,
-    generate_pdf_report,
+    prepare_resume_hits,
+    score_role,
+    rank_results,
     generate_learning_plan,
     explain_recommendation
 )
-from pipeline.role_detector import detect_role
-from pipeline.role_builder import build_new_role
-from pipeline.role_inference import infer_role_name
+from pipeline.role_classifier import classify_role
 
 
 st.set_page_config(page_title="Resume Skill Gap Analyzer", layout="centered")
 
-BASE_DIR = Path(__file__).resolve().parent
-if not (BASE_DIR / "data").exists():
-    BASE_DIR = BASE_DIR.parent
+DEFAULT_ROLES = ["mlengineer", "datascientist", "webdeveloper", "softwaredeveloper"]
+
+CACHE_ENTRIES = 64
 
-DATA_DIR = BASE_DIR / "data"
 
-DEFAULT_ROLES = ["mlengineer", "datascientist", "webdeveloper", "softwaredeveloper"]
+# Streamlit reruns this script on every widget interaction, so each stage is
+# memoized on its own: keyed by the upload's content hash (never its file name)
+# and, once skills are involved, the ontology version. Arguments starting with
+# an underscore are not hashed by st.cache_data.
+
+@st.cache_data(max_entries=CACHE_ENTRIES, show_spinner=False)
+def extract_stage(resume_hash, _data):
+    return extract_text(_data)
+
+
+@st.cache_data(max_entries=CACHE_ENTRIES, show_spinner=False)
+def clean_stage(resume_hash, _raw_text):
+    return clean_text(_raw_text)
+
 
-JD_FILES = {
-    "mlengineer": "jd_ml.txt",
-    "datascientist": "jd_ds.txt",
-    "webdeveloper": "jd_web.txt",
-    "softwaredeveloper": "jd_swe.txt"
-}
+@st.cache_data(max_entries=CACHE_ENTRIES, show_spinner=False)
+def hits_stage(resume_hash, version, _cleaned_resume, _raw_text, _ontology):
+    return prepare_resume_hits(_cleaned_resume, _raw_text, _ontology)
 
-if "analysis_done" not in st.session_state:
-    st.session_state.analysis_done = False
 
-if "last_input_signature" not in st.session_state:
-    st.session_state.last_input_signature = None
+@st.cache_data(max_entries=CACHE_ENTRIES, show_spinner=False)
+def detect_stage(jd_hash, version, _jd_text, _ontology):
+    return classify_role(_jd_text, ontology=_ontology)
+
+
+@st.cache_data(max_entries=CACHE_ENTRIES * len(DEFAULT_ROLES), show_spinner=False)
+def score_stage(resume_hash, version, role, _hits, _ontology):
+    resume_hits, project_hits = _hits
+    return score_role(resume_hits, project_hits, role, _ontology)
+
+
+if "analyzed" not in st.session_state:
+    st.session_state.analyzed = None
+
+if "learned_roles" not in st.session_state:
+    st.session_state.learned_roles = {}
+
+if "learned_jds" not in st.session_state:
+    st.session_state.learned_jds = set()
 
 st.title("Resume Skill Gap Analyzer")
 st.write("Upload your resume and optionally paste a job description.")
@@ -46,130 +69,142 @@ st.write("Upload your resume and optionally paste a job description.")
 resume_file = st.file_uploader("Upload Resume (PDF)", type=["pdf"])
 jd_input = st.text_area("Paste Job Description (optional)")
 
-
-current_signature = (
-    resume_file.name if resume_file else "",
-    jd_input.strip()
-)
-
-if current_signature != st.session_state.last_input_signature:
-    st.session_state.analysis_done = False
-    st.session_state.last_input_signature = current_signature
+resume_bytes = resume_file.getvalue() if resume_file else b""
+resume_hash = content_hash(resume_bytes) if resume_file else ""
+jd_hash = hashlib.sha256(jd_input.strip().encode("utf-8")).hexdigest()
+signature = (resume_hash, jd_hash)
 
 
 if st.button("Analyze"):
-
     if not resume_file:
         st.error("Please upload a resume.")
         st.stop()
+    st.session_state.analyzed = signature
 
-    with st.spinner("Extracting resume..."):
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-            tmp.write(resume_file.read())
-            resume_path = tmp.name
+# later interactions (checkbox, downloads) keep showing the analysis for as long
+# as the inputs are unchanged; every stage below is then served from cache
+if st.session_state.analyzed != signature:
+    st.stop()
 
-        from pypdf import PdfReader
 
-        reader = PdfReader(resume_path)
-        raw_text = ""
-        for page in reader.pages:
-            raw_text += page.extract_text() or ""
+with st.spinner("Extracting resume..."):
+    try:
+        raw_text = extract_stage(resume_hash, resume_bytes)
+    except PdfBudgetExceeded as e:
+        st.error(f"Resume could not be processed: {e}")
+        st.stop()
 
-        cleaned_resume = clean_text(raw_text)
+    cleaned_resume = clean_stage(resume_hash, raw_text)
 
-        os.remove(resume_path)
+if not raw_text.strip():
+    st.error("Failed to extract text from resume.")
+    st.stop()
 
-    if not raw_text.strip():
-        st.error("Failed to extract text from resume.")
-        st.stop()
 
+target_role = None
 
-    jd_texts = {}
+if jd_input.strip():
+    ontology = get_ontology()
+    classification = detect_stage(jd_hash, ontology.version, jd_input, ontology)
+    target_role = classification["role"]
 
-    if jd_input.strip():
-        detected_role = detect_role(jd_input)
+    if target_role is None:
+        target_role = classification["inferred_role"]
 
-        if detected_role is None:
-            inferred_role = infer_role_name(jd_input)
-            build_new_role(inferred_role, jd_input)
-            detected_role = inferred_role
-            st.warning(f"New role learned: {detected_role.upper()}")
+        if st.session_state.learned_roles.get(jd_hash) != target_role:
+            from pipeline.role_builder import build_new_role
 
-        st.success(f"Detected Job Role: {detected_role.upper()}")
-        jd_texts[detected_role] = jd_input
-        st.session_state.target_role = detected_role
+            build_new_role(target_role, jd_input)
+            st.session_state.learned_roles[jd_hash] = target_role
+        st.warning(f"New role learned: {target_role.upper()}")
 
-    else:
-        for role in DEFAULT_ROLES:
-            jd_path = DATA_DIR / JD_FILES[role]
-            jd_texts[role] = jd_path.read_text(encoding="utf-8")
-        st.session_state.target_role = None
+    st.success(f"Detected Job Role: {target_role.upper()}")
+    roles = [target_role]
 
+else:
+    roles = DEFAULT_ROLES
 
-    with st.spinner("Analyzing skills..."):
-        results = evaluate_multiple_roles(cleaned_resume, raw_text, jd_texts)
 
-    best = results[0]
+# fetched after role detection, which may just have learned a new role
+ontology = get_ontology()
 
-    if st.session_state.target_role and best["role"] != st.session_state.target_role:
-        st.warning("Resume matches another role better than the provided job description.")
+with st.spinner("Analyzing skills..."):
+    hits = hits_stage(resume_hash, ontology.version, cleaned_resume, raw_text, ontology)
 
+st.subheader("Role Scores")
+progress = st.progress(0.0)
 
-    if not st.session_state.analysis_done:
-        report_path = save_final_report(best)
-        pdf_path = generate_pdf_report(best, report_path)
+results = []
+for done, role in enumerate(roles, 1):
+    result = score_stage(resume_hash, ontology.version, role, hits, ontology)
 
-        st.session_state.report_path = report_path
-        st.session_state.pdf_path = pdf_path
-        st.session_state.best = best
-        st.session_state.analysis_done = True
+    if result is None:
+        st.write(f"**{role.upper()}**: no core skills matched")
     else:
-        best = st.session_state.best
-        report_path = st.session_state.report_path
-        pdf_path = st.session_state.pdf_path
+        st.write(f"**{role.upper()}**: {result['score']}%")
+        results.append(result)
 
+    progress.progress(done / len(roles))
 
-    st.success("Analysis complete")
-    st.markdown("---")
+progress.empty()
 
-    st.subheader("Recommended Role")
-    st.write(best["role"].upper())
+best = rank_results(results)[0]
 
-    st.subheader("Match Score")
-    st.write(f"{best['score']}%")
-    st.progress(best["score"] / 100)
+if target_role and best["role"] != target_role:
+    st.warning("Resume matches another role better than the provided job description.")
 
-    st.subheader("Verdict")
-    st.write(best["verdict"])
 
-    if best["verdict"] != "NO SUITABLE ROLE FOUND":
+report_key = (signature, ontology.version)
 
-        st.subheader("Why This Role?")
-        st.write(explain_recommendation(best))
+if st.session_state.get("report_key") != report_key:
+    st.session_state.reports = submit_reports(best)
+    st.session_state.report_stem = report_stem()
+    st.session_state.report_key = report_key
 
-        st.subheader("Skill Gap Breakdown")
-        for tier in ["core", "preferred", "tools"]:
-            missing = best["report"][tier]["missing"] or []
-            matched = best["report"][tier]["matched"] or []
 
-            st.write(f"**{tier.upper()} SKILLS**")
-            st.write("Matched:", ", ".join(matched) if matched else "None")
-            st.write("Missing:", ", ".join(missing) if missing else "None")
+st.success("Analysis complete")
+st.markdown("---")
 
-        st.subheader("Personalized Learning Roadmap")
-        for step in generate_learning_plan(best["report"]):
-            st.write("•", step)
+st.subheader("Recommended Role")
+st.write(best["role"].upper())
 
-    else:
-        st.warning("The resume does not sufficiently match the selected job description.")
-    if st.checkbox("Learn new skills from this job description"):
+st.subheader("Match Score")
+st.write(f"{best['score']}%")
+st.progress(best["score"] / 100)
+
+st.subheader("Verdict")
+st.write(best["verdict"])
+
+if best["verdict"] != "NO SUITABLE ROLE FOUND":
+
+    st.subheader("Why This Role?")
+    st.write(explain_recommendation(best))
+
+    st.subheader("Skill Gap Breakdown")
+    for tier in ["core", "preferred", "tools"]:
+        missing = best["report"][tier]["missing"] or []
+        matched = best["report"][tier]["matched"] or []
+
+        st.write(f"**{tier.upper()} SKILLS**")
+        st.write("Matched:", ", ".join(matched) if matched else "None")
+        st.write("Missing:", ", ".join(missing) if missing else "None")
+
+    st.subheader("Personalized Learning Roadmap")
+    for step in generate_learning_plan(best["report"]):
+        st.write("•", step)
+
+else:
+    st.warning("The resume does not sufficiently match the selected job description.")
+if st.checkbox("Learn new skills from this job description"):
+    if jd_hash not in st.session_state.learned_jds:
         from pipeline.jd_learner import learn_from_jd
         learn_from_jd(jd_input)
-        st.success("New skills saved for future sessions.")
+        st.session_state.learned_jds.add(jd_hash)
+    st.success("New skills saved for future sessions.")
 
 
-    with open(report_path, "r", encoding="utf-8") as f:
-        st.download_button("Download TXT Report", f.read(), file_name=report_path.name)
+reports = st.session_state.reports.result()
+stem = st.session_state.report_stem
 
-    with open(pdf_path, "rb") as f:
-        st.download_button("Download PDF Report", f, file_name=pdf_path.name)
+st.download_button("Download TXT Report", reports["txt"], file_name=f"{stem}.txt")
+st.download_button("Download PDF Report", reports["pdf"], file_name=f"{stem}.pdf")